@@ -0,0 +1,289 @@
+# 性能基准：在固定的局面集合（开局、中局、战术）上测量规则、评估、搜索和绘制的耗时
+#   python benchmark.py --output baseline.json           测量并保存
+#   python benchmark.py --compare baseline.json          与保存的结果比较，变慢超过容差时返回1
+# 局面只由随机数种子和规则生成，不依赖评估函数，改动评估或绘制后测的仍是同一批局面
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from engine import ai
+from engine.bitboard import SIZE, BLACK, WHITE, DIRECTIONS
+from engine.position import Position
+
+SEED = 20240615
+SETS = {
+    # 名称：(局面数, 最少子数, 最多子数)
+    "opening": (20, 1, 6),
+    "middlegame": (20, 20, 40),
+    "tactical": (20, 10, 30),
+}
+
+
+def random_position(rng, stones, size=SIZE):
+    # 从天元开始在已有棋子周围随机落子，不让任何一方连成五
+    board = Position(size)
+    board.place(size // 2, size // 2, BLACK)
+    player = WHITE
+    while len(board.moves) < stones:
+        cells = sorted(board.cells(board.frontier))
+        rng.shuffle(cells)
+        for col, row in cells:
+            if not board.place(col, row, player):
+                break
+            board.undo()
+        else:
+            break
+        player = BLACK if player == WHITE else WHITE
+    return board
+
+
+def tactical(board):
+    # 有一方能一步成五，或轮到的一方能成四
+    player = BLACK if len(board.moves) % 2 == 0 else WHITE
+    return (
+        board.threat_cells(BLACK, 4)
+        or board.threat_cells(WHITE, 4)
+        or board.threat_cells(player, 3)
+    )
+
+
+def positions(name):
+    count, low, high = SETS[name]
+    rng = random.Random(f"{SEED}-{name}")
+    ret = []
+    while len(ret) < count:
+        board = random_position(rng, rng.randint(low, high))
+        if name != "tactical" or tactical(board):
+            ret.append(board)
+    return ret
+
+
+def lines(board, pos):
+    # 与原来的get_score相同：在pos放白子，取经过该点的四条线，"2"为白子
+    board.set(pos[0], pos[1], WHITE)
+    ret = [
+        "".join(str(v) for v in board.line(pos[0], pos[1], dx, dy))
+        for dx, dy in DIRECTIONS
+    ]
+    board.clear(pos[0], pos[1])
+    return ret
+
+
+def measure(function, calls, min_time):
+    # 轮流调用calls里的参数，至少跑完一遍且不少于min_time秒
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for args in calls:
+            function(*args)
+        count += len(calls)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    return {
+        "latency_us": elapsed / count * 1e6,
+        "calls_per_sec": count / elapsed,
+        "calls": count,
+    }
+
+
+def engine_benchmarks(sets, min_time, nodes):
+    import server
+
+    chat = server.ChatServer.__new__(server.ChatServer)  # 不启动监听，只用判胜
+    searcher = ai.create("alphabeta", time_limit=None, node_limit=nodes)
+
+    def get_pos(board):
+        # 每次清空置换表，结果只取决于局面和节点数
+        searcher.tt.clear()
+        searcher.search(board, WHITE)
+
+    # 判胜的开销在落子时：每次重新落下最后一步再判胜，之后悔掉以便重复测量
+    def five(board, col, row, player):
+        board.place(col, row, player)
+        ai.five(board)
+        board.undo()
+
+    def check_winner(board, col, row, player):
+        board.place(col, row, player)
+        chat.check_winner(board, col, row, player)
+        board.undo()
+
+    results = {}
+    for name, boards in sets.items():
+        frontier = [(pos, board) for board in boards for pos in ai.get_charge_pos(board)]
+        last = []  # (去掉最后一步的局面, 最后一步)
+        for board in boards:
+            before = board.copy()
+            last.append((before, *before.undo()))
+        cases = {
+            "five": (five, last),
+            "get_charge_pos": (ai.get_charge_pos, [(board,) for board in boards]),
+            "get_score": (ai.get_score, frontier),
+            "get_line_score": (
+                ai.get_line_score,
+                [(lines(board, pos),) for pos, board in frontier],
+            ),
+            "check_winner": (check_winner, last),
+        }
+        for case, (function, calls) in cases.items():
+            results[f"{case}/{name}"] = measure(function, calls, min_time)
+        # 搜索较慢，一遍通常就超过min_time，但集合里的每个局面都要搜到
+        results[f"get_pos/{name}"] = measure(get_pos, [(b,) for b in boards], min_time)
+    return results
+
+
+class Offline:
+    # 代替ConnectionServer：不连服务器，绘制时只读这几个属性
+    is_connected = False
+    connecting = False
+    is_matched = False
+    room_id = None
+    player_number = None
+    opponent_id = None
+
+    def close(self):
+        pass
+
+
+def frame_times(times):
+    # frame_ms取中位数，偶尔被系统打断的几帧不影响比较
+    times = sorted(times)
+    return {
+        "frame_ms": times[len(times) // 2] * 1000,
+        "mean_ms": sum(times) / len(times) * 1000,
+        "p95_ms": times[int(len(times) * 0.95)] * 1000,
+        "frames": len(times),
+    }
+
+
+def render_benchmark(board, frames, min_time, height=1000):
+    # 在SDL虚拟显示上绘制，每帧包括更新到屏幕，返回整帧重画和增量重画两项的每帧耗时（毫秒）；
+    # 每项至少画frames帧且不少于min_time秒：
+    #   full         每帧都重建各层、重画整个窗口（第一帧、窗口尺寸变了时）
+    #   incremental  每帧轮流落一子、悔掉这一子，只重画变化的格子和浮层（对局中的常态）
+    # 只开窗口、建对局，不占端口、不放音乐、不连服务器，客户端正在运行时也能测
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    try:
+        import pygame
+        import gobang
+
+        pygame.display.init()
+        sizes = gobang.window(height)
+        gobang.glyphs.load(sizes)  # 字体在这里同步加载，每帧都画出文字
+        game = gobang.game = gobang.Game(server=Offline())
+    except Exception as e:
+        return {"Game.start": {"skipped": f"{type(e).__name__}: {e}"}}
+    game.started = True
+    game.board = board.copy()
+    game.steps = list(board.moves)
+    game.down = board.moves[-1][:2]
+    cells = list(game.board.cells(game.board.frontier))
+    player = BLACK if len(game.steps) % 2 == 0 else WHITE
+
+    def frame():
+        start = time.perf_counter()
+        pygame.display.update(game.start())
+        return time.perf_counter() - start
+
+    def enough(times, since):
+        return len(times) >= frames and time.perf_counter() - since >= min_time
+
+    full, incremental = [], []
+    try:
+        since = time.perf_counter()
+        while not enough(full, since):
+            gobang.renderer.geometry = None
+            full.append(frame())
+        since = time.perf_counter()
+        # 成对地落子、悔棋，结束时棋盘回到原来的局面
+        while not (enough(incremental, since) and len(incremental) % 2 == 0):
+            i = len(incremental)
+            if i % 2 == 0:
+                col, row = cells[i // 2 % len(cells)]
+                game.board.place(col, row, player)
+                game.steps.append((col, row, player))
+                game.down = (col, row)
+            else:
+                game.board.undo()
+                game.steps.pop()
+                game.down = game.steps[-1][:2]
+            incremental.append(frame())
+    except Exception as e:
+        return {"Game.start": {"skipped": f"{type(e).__name__}: {e}"}}
+    finally:
+        game.close_ai()
+        pygame.quit()
+    return {
+        "Game.start/full": frame_times(full),
+        "Game.start/incremental": frame_times(incremental),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # 打印每一项相对基准的变化，返回变慢超过容差的项
+    slower = []
+    for key, value in results.items():
+        old = baseline.get(key)
+        metric = "frame_ms" if "frame_ms" in value else "latency_us"
+        if not old or metric not in old or metric not in value:
+            print(f"{key:32} 无基准")
+            continue
+        ratio = value[metric] / old[metric]
+        mark = ""
+        if ratio > 1 + tolerance:
+            mark = "  变慢"
+            slower.append(key)
+        elif ratio < 1 - tolerance:
+            mark = "  变快"
+        digits = 3 if metric == "frame_ms" else 1
+        print(
+            f"{key:32} {old[metric]:12.{digits}f} -> {value[metric]:12.{digits}f}"
+            f"  {ratio:6.2f}x{mark}"
+        )
+    return slower
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="性能基准")
+    parser.add_argument("--output", help="结果写入的JSON文件")
+    parser.add_argument("--compare", help="与之比较的基准JSON文件")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="允许的变慢比例")
+    parser.add_argument("--min-time", type=float, default=0.3, help="每项至少测量的秒数")
+    parser.add_argument("--nodes", type=int, default=1000, help="get_pos每次搜索的节点数")
+    parser.add_argument("--frames", type=int, default=120, help="整帧重画、增量重画各至少测几帧")
+    parser.add_argument("--no-render", action="store_true", help="不测绘制")
+    args = parser.parse_args()
+
+    sets = {name: positions(name) for name in SETS}
+    results = engine_benchmarks(sets, args.min_time, args.nodes)
+    if not args.no_render:
+        results.update(
+            render_benchmark(sets["middlegame"][0], args.frames, args.min_time)
+        )
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        slower = compare(results, baseline, args.tolerance)
+        if slower:
+            print(f"{len(slower)}项变慢超过{args.tolerance:.0%}：{', '.join(slower)}")
+            sys.exit(1)
+    elif not args.output:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
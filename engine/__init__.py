@@ -0,0 +1,3 @@
+# 五子棋引擎：规则、棋盘和AI，不依赖pygame，客户端和服务器共用
+from .bitboard import SIZE, EMPTY, BLACK, WHITE, DIRECTIONS, BitBoard
+from .rules import Board
@@ -0,0 +1,17 @@
+# 命令行引擎：python -m engine，按Gomocup/Piskvork协议与对局管理器通信
+import argparse
+from . import ai, book
+from .protocol import Brain
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="五子棋引擎（Gomocup/Piskvork协议）")
+    parser.add_argument("--engine", choices=ai.ENGINES, default="alphabeta")
+    parser.add_argument("--workers", type=int, default=1, help="搜索用的进程数")
+    parser.add_argument("--book", help="开局库文件")
+    args = parser.parse_args()
+
+    Brain(
+        args.engine,
+        args.workers,
+        book.load(args.book) if args.book else None,
+    ).run()
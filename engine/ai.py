@@ -0,0 +1,50 @@
+# 与界面无关的AI入口：客户端、命令行协议和基准测试都从这里创建引擎、调用评估函数
+# 只依赖engine包，导入时不打开窗口、不连网络
+from . import patterns
+from .bitboard import WHITE
+from .position import Position
+from .parallel import ParallelSearcher
+from .mcts import MCTS
+
+ENGINES = ("alphabeta", "mcts")
+
+
+def create(engine="alphabeta", **options):
+    # engine为"alphabeta"（博弈树搜索）或"mcts"（蒙特卡洛树搜索），其余参数传给搜索器
+    if engine == "mcts":
+        return MCTS(**options)
+    if engine == "alphabeta":
+        return ParallelSearcher(**options)
+    raise ValueError(f"未知的引擎: {engine}")
+
+
+def five(board):
+    # 规则核心在每次落子时只检查经过该点的四条线，返回赢家或False
+    return board.winner or False
+
+
+def get_valid_move(board):
+    return list(board.cells(board.empties()))
+
+
+def get_charge_pos(board):
+    # 带缓存的棋盘在落子时已维护好候选点，普通位棋盘一次移位求出
+    if isinstance(board, Position):
+        return list(board.cells(board.frontier))
+    return list(board.cells(board.neighbours(1)))
+
+
+def get_line_score(line):
+    return patterns.get_line_score(line)
+
+
+def get_score(pos, board, player=WHITE):
+    # 带评分缓存的棋盘直接查表，其它棋盘逐条线计算（只支持以白子为己方）
+    if isinstance(board, Position):
+        return board.score(pos[0], pos[1], player)
+    return patterns.get_score(pos, board)
+
+
+def opp_board(board):
+    # 黑白互换只需交换两个整数
+    return board.swapped()
@@ -0,0 +1,167 @@
+# 复盘分析：对一局的每一步，搜索落子前的局面，得出引擎推荐的着法、这一步损失的分数和败着
+# 各局面互不依赖，分给多个进程同时搜索，整局的用时约等于最慢的一个局面（局面数不超过进程数时）
+# 结果按 (局面哈希, 落子一方, 实际着法) 缓存，同一局再分析或不同对局里出现相同局面时不再搜索
+#   python -m engine.analysis results.jsonl --time 1
+import os
+from .bitboard import SIZE, BLACK, WHITE
+from .position import Position
+from .search import Searcher, WIN
+from .parallel import snapshot, restore
+
+# 分数的量级见evaluate：一个活三级的威胁约10000，活四50000
+MISTAKE = 10000  # 损失超过此分数为疑问手
+BLUNDER = 50000  # 损失超过此分数，或把胜局下成不胜、把不败下成败局，为败着
+PROVEN = WIN - 100  # 分数超过此值为已证明的胜负
+
+_searcher = None
+
+
+def _init(options):
+    global _searcher
+    _searcher = Searcher(**options)
+
+
+def _analyse(state, player, move):
+    return evaluate(_searcher, restore(None, state), player, move)
+
+
+def evaluate(searcher, board, player, move):
+    # 返回 (推荐着法, 推荐着法的分数, 实际着法move的分数)，分数从player的角度
+    best = searcher.search(board, player)
+    value, depth = searcher.value, searcher.depth
+    if best == move:
+        return best, value, value
+    # 实际着法单独按同样的深度再搜一遍，两个分数才可比（不同深度的静态评估相差很大）
+    max_depth = searcher.max_depth
+    searcher.max_depth = max(depth, 2)
+    searcher.deadline = None
+    try:
+        searcher.deepen(board.copy(), player, [move], move)
+        played = searcher.value
+    finally:
+        searcher.max_depth = max_depth
+    return best, value, played
+
+
+class Analyzer:
+    def __init__(self, workers=None, time_limit=1.0, **options) -> None:
+        # 每个局面搜索time_limit秒；workers为进程数，默认为CPU核数，为1时在当前进程里逐个搜索
+        self.workers = workers or os.cpu_count() or 1
+        self.options = dict(options, time_limit=time_limit, book=None)
+        self.cache = {}  # (局面哈希, 落子一方, 实际着法) -> evaluate的结果
+        self.pool = None
+        self.searcher = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def positions(self, steps, size=SIZE):
+        # 每一步落子前的局面：[(缓存键, 快照, 落子一方, 实际着法)]
+        board = Position(size)
+        ret = []
+        for col, row, player in steps:
+            key = (board.hash, player, (col, row))
+            ret.append((key, snapshot(board), player, (col, row)))
+            board.place(col, row, player)
+        return ret
+
+    def search(self, todo):
+        # 搜索缓存里没有的局面，多进程时同时提交，按提交顺序取回
+        if self.workers > 1 and len(todo) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            from concurrent.futures.process import BrokenProcessPool
+
+            if self.pool is None:
+                # 第一次分析时才启动进程，之后一直保留
+                self.pool = ProcessPoolExecutor(
+                    self.workers, initializer=_init, initargs=(self.options,)
+                )
+            try:
+                futures = [
+                    (job[0], self.pool.submit(_analyse, *job[1:])) for job in todo
+                ]
+                for key, future in futures:
+                    self.cache[key] = future.result()
+                return
+            except BrokenProcessPool:
+                # 有工作进程意外退出后进程池不能再用：丢掉它（下次分析再新建），
+                # 还没结果的局面在当前进程里逐个搜索
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+                todo = [job for job in todo if job[0] not in self.cache]
+        if self.searcher is None:
+            self.searcher = Searcher(**self.options)
+        for key, state, player, move in todo:
+            board = restore(None, state)
+            self.cache[key] = evaluate(self.searcher, board, player, move)
+
+    def analyse(self, steps, size=SIZE):
+        # 返回每一步的分析：{"ply", "move", "player", "best", "value", "played", "loss", "mark"}
+        # value为落子前局面的分数，played为实际着法之后的分数，都从落子一方的角度
+        # mark为"败着"、"疑问手"或None
+        steps = [tuple(step) for step in steps]
+        positions = self.positions(steps, size)
+        todo = {}
+        for job in positions:
+            if job[0] not in self.cache:
+                todo[job[0]] = job
+        self.search(list(todo.values()))
+
+        ret = []
+        for (col, row, player), job in zip(steps, positions):
+            best, value, played = self.cache[job[0]]
+            loss = max(0, value - played)
+            mark = None
+            if best != (col, row):
+                if (
+                    (value >= PROVEN and played < PROVEN)
+                    or (played <= -PROVEN and value > -PROVEN)
+                    or loss >= BLUNDER
+                ):
+                    mark = "败着"
+                elif loss >= MISTAKE:
+                    mark = "疑问手"
+            ret.append(
+                {
+                    "ply": len(ret) + 1,
+                    "move": (col, row),
+                    "player": player,
+                    "best": best,
+                    "value": value,
+                    "played": played,
+                    "loss": loss,
+                    "mark": mark,
+                }
+            )
+        return ret
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="复盘分析对局记录")
+    parser.add_argument("games", help="对局记录文件（JSON行，与开局库、对抗赛的格式相同）")
+    parser.add_argument("--time", type=float, default=1.0, help="每个局面的搜索时间")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--size", type=int, default=SIZE)
+    args = parser.parse_args()
+
+    analyzer = Analyzer(args.jobs, args.time)
+    names = {BLACK: "黑", WHITE: "白"}
+    with open(args.games, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            game = json.loads(line)
+            steps = game["steps"] if isinstance(game, dict) else game
+            print(f"第{number}局，{len(steps)}步")
+            for r in analyzer.analyse(steps, args.size):
+                if r["mark"]:
+                    print(
+                        f"  {r['ply']:3} {names[r['player']]} {r['move']} {r['mark']}，"
+                        f"推荐 {r['best']}，损失 {r['loss']}"
+                    )
+    analyzer.close()
@@ -0,0 +1,151 @@
+# NumPy批量评估：把棋盘打包成int8数组，用滑动窗口视图一次取出所有行、列、斜线上的7格窗口，
+# 对所有候选点、黑白双方一起查棋型表并合成得分。没有安装NumPy时available为False，由调用方退回逐点查表
+# NumPy在第一次用到时才导入，不用这个后端时不拖慢启动
+import importlib.util
+
+from .bitboard import BLACK, WHITE
+from . import evaluate
+from .evaluate import (
+    FIVE,
+    LIVE_FOUR,
+    RUSH_FOUR,
+    LIVE_THREE,
+    SLEEP_THREE_FIRST,
+    SLEEP_THREE,
+    LIVE_TWO,
+    SLEEP_TWO,
+    DEAD_SHIFT,
+)
+from .patterns import TABLES, WINDOW, DEAD_COUNT
+
+available = importlib.util.find_spec("numpy") is not None
+np = None
+sliding_window_view = None
+
+_layouts = {}
+
+
+def load():
+    global np, sliding_window_view
+    if np is None:
+        import numpy
+        from numpy.lib.stride_tricks import sliding_window_view as view
+
+        np, sliding_window_view = numpy, view
+
+
+class Layout:
+    # 同一尺寸的棋盘共用：每个方向把所有线排成 (线数, size + 6) 的位序矩阵，线外指向哨兵格
+    def __init__(self, masks) -> None:
+        size = masks.size
+        self.size = size
+        self.count = size * masks.stride
+        self.sentinel = self.count  # 展开后的棋盘在最后多一格，值为3（线外）
+        self.lines = []
+        for d in range(4):
+            lines = sorted({line for line in masks.lines[d] if line})
+            index = np.full((len(lines), size + WINDOW - 1), self.sentinel, np.intp)
+            for n, line in enumerate(lines):
+                index[n, : len(line)] = line
+            self.lines.append(index)
+        self.tables = {
+            player: np.array(TABLES[player], np.int32) for player in (BLACK, WHITE)
+        }
+        self.weights = (4 ** np.arange(WINDOW)).astype(np.int32)
+        self.dead_count = np.array(DEAD_COUNT, np.int64)
+
+
+def layout(masks):
+    load()
+    if masks.size not in _layouts:
+        _layouts[masks.size] = Layout(masks)
+    return _layouts[masks.size]
+
+
+def unpack(bits, count):
+    # Python大整数 -> 每格一个0/1的数组
+    data = np.frombuffer(bits.to_bytes((count + 7) // 8, "little"), np.uint8)
+    return np.unpackbits(data, bitorder="little")[:count]
+
+
+def flags(lay, grid, player):
+    # 返回 (4, count + 1)：player落在各格时四个方向的棋型标志（只有空位有意义）
+    size = lay.size
+    table = lay.tables[player]
+    ret = np.zeros((4, lay.count + 1), np.int32)
+    for d, index in enumerate(lay.lines):
+        values = grid[index]
+        codes = sliding_window_view(values, WINDOW, axis=1)[:, :size] @ lay.weights
+        starts = table[codes]
+        prefix = np.bitwise_or.accumulate(starts, axis=1)
+        suffix = np.bitwise_or.accumulate(starts[:, ::-1], axis=1)[:, ::-1]
+        # 与patterns.empty_features相同：前缀、后缀中不经过该格的棋型，加上覆盖该格的7个窗口
+        out = np.zeros_like(starts)
+        out[:, :-1] = suffix[:, 1:]
+        out[:, WINDOW:] |= prefix[:, :-WINDOW]
+        for j in range(WINDOW):
+            out[:, j:] |= table[codes[:, : size - j] | (player << (2 * j))]
+        ret[d, index[:, :size]] = out
+    return ret
+
+
+def combine(lay, f):
+    # 与evaluate.features、combine逐项对应，对所有格子同时计算
+    any_ = f[0] | f[1] | f[2] | f[3]
+
+    def has(flag):
+        return (any_ & flag) != 0
+
+    def count(flag):
+        return ((f & flag) != 0).sum(axis=0)
+
+    rush_four = count(RUSH_FOUR)
+    live_three = count(LIVE_THREE)
+    live_two = count(LIVE_TWO)
+    terms = (
+        has(FIVE),
+        has(LIVE_FOUR),
+        rush_four >= 2,
+        (rush_four > 0) & (live_three > 0),
+        live_three >= 2,
+        (live_three > 0) & has(SLEEP_THREE_FIRST),
+        rush_four,
+        live_three,
+        live_two >= 2,
+        count(SLEEP_THREE),
+        (live_two > 0) & has(SLEEP_TWO),
+        live_two,
+        count(SLEEP_TWO),
+        lay.dead_count[f >> DEAD_SHIFT].sum(axis=0),
+    )
+    score = np.zeros(f.shape[1], np.int64)
+    for weight, term in zip(evaluate.weights, terms):
+        if weight:
+            score += weight * term
+    # 与evaluate.bound相同
+    five = terms[0]
+    threat = five | terms[1] | terms[2] | terms[3] | terms[4]
+    score = np.where(five, score, np.minimum(score, evaluate.FIVE_SCORE - 1))
+    return np.where(threat, score, np.minimum(score, evaluate.THREAT_SCORE - 1))
+
+
+def candidates(board, player, radius=1):
+    # 与Searcher.candidates的结果相同：[(进攻分 + 防守分, 进攻分, 防守分, (col, row))]，按总分从高到低，同分保持位序
+    lay = layout(board.masks)
+    count = lay.count
+    grid = np.full(count + 1, 3, np.int8)
+    grid[:count] = unpack(board.black, count) + 2 * unpack(board.white, count)
+    opponent = BLACK if player == WHITE else WHITE
+
+    cells = np.flatnonzero(unpack(board.neighbours(radius), count))
+    if not len(cells):
+        return []
+    attack = combine(lay, flags(lay, grid, player)[:, cells])
+    defense = combine(lay, flags(lay, grid, opponent)[:, cells])
+    total = attack + defense
+    order = np.argsort(-total, kind="stable")
+    stride = board.stride
+    return [
+        (int(total[i]), int(attack[i]), int(defense[i]), divmod(int(cells[i]), stride))
+        for i in order
+    ]
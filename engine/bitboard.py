@@ -0,0 +1,242 @@
+# 位棋盘：每种颜色用一个整数表示，第col列第row行对应第col * (size + 1) + row位
+# 每列多留一位哨兵（恒为0），这样沿行、斜线移位时不会串到相邻的列
+SIZE = 15
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+
+# 横，竖，左斜，右斜
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+_tables = {}
+
+
+class Masks:
+    # 预先计算好的掩码，同一尺寸的棋盘共用一份
+    def __init__(self, size) -> None:
+        self.size = size
+        self.stride = size + 1
+        stride = self.stride
+        self.full = 0
+        self.cols = [0] * size
+        self.rows = [0] * size
+        self.diags = {}  # 左斜，以col - row为键
+        self.antis = {}  # 右斜，以col + row为键
+        for col in range(size):
+            for row in range(size):
+                bit = 1 << (col * stride + row)
+                self.full |= bit
+                self.cols[col] |= bit
+                self.rows[row] |= bit
+                self.diags[col - row] = self.diags.get(col - row, 0) | bit
+                self.antis[col + row] = self.antis.get(col + row, 0) | bit
+        # 与DIRECTIONS一一对应的移位量
+        self.shifts = tuple(dx * stride + dy for dx, dy in DIRECTIONS)
+        self._around = {}
+        # lines[d][index]：经过该格、沿DIRECTIONS[d]方向的整条线上各格的位序，从线的一端开始
+        # slices[d][index]：同一条线的切片，线上的位序是等差的，按位序存放的列表可以整条线一次读写
+        self.lines = []
+        self.slices = []
+        for (dx, dy), shift in zip(DIRECTIONS, self.shifts):
+            lines = [()] * (size * stride)
+            slices = [None] * (size * stride)
+            for col in range(size):
+                for row in range(size):
+                    if 0 <= col - dx < size and 0 <= row - dy < size:
+                        continue  # 不是线的起点
+                    cells = []
+                    x, y = col, row
+                    while 0 <= x < size and 0 <= y < size:
+                        cells.append(x * stride + y)
+                        x += dx
+                        y += dy
+                    cells = tuple(cells)
+                    part = slice(cells[0], cells[-1] + 1, shift)
+                    for index in cells:
+                        lines[index] = cells
+                        slices[index] = part
+            self.lines.append(lines)
+            self.slices.append(slices)
+
+    def around(self, radius):
+        # around(radius)[index]：与该格距离不超过radius的格子（不含自身）组成的掩码
+        if radius not in self._around:
+            size, stride = self.size, self.stride
+            around = [0] * (size * stride)
+            for col in range(size):
+                for row in range(size):
+                    m = 0
+                    for x in range(max(0, col - radius), min(size, col + radius + 1)):
+                        for y in range(
+                            max(0, row - radius), min(size, row + radius + 1)
+                        ):
+                            m |= 1 << (x * stride + y)
+                    around[col * stride + row] = m & ~(1 << (col * stride + row))
+            self._around[radius] = around
+        return self._around[radius]
+
+    def line(self, col, row, direction):
+        # 经过(col, row)、沿DIRECTIONS[direction]方向的整条线
+        if direction == 0:
+            return self.rows[row]
+        if direction == 1:
+            return self.cols[col]
+        if direction == 2:
+            return self.diags[col - row]
+        return self.antis[col + row]
+
+
+def masks(size=SIZE):
+    if size not in _tables:
+        _tables[size] = Masks(size)
+    return _tables[size]
+
+
+class BitBoard:
+    def __init__(self, size=SIZE) -> None:
+        self.size = size
+        self.stride = size + 1
+        self.masks = masks(size)
+        self.black = 0
+        self.white = 0
+
+    def index(self, col, row):
+        return col * self.stride + row
+
+    def position(self, index):
+        return divmod(index, self.stride)
+
+    def inside(self, col, row):
+        return 0 <= col < self.size and 0 <= row < self.size
+
+    def stones(self, player):
+        return self.black if player == BLACK else self.white
+
+    @property
+    def occupied(self):
+        return self.black | self.white
+
+    def get(self, col, row):
+        bit = 1 << (col * self.stride + row)
+        if self.black & bit:
+            return BLACK
+        if self.white & bit:
+            return WHITE
+        return EMPTY
+
+    def is_empty(self, col, row):
+        return self.inside(col, row) and not (
+            (self.black | self.white) >> (col * self.stride + row) & 1
+        )
+
+    def set(self, col, row, player):
+        bit = 1 << (col * self.stride + row)
+        if player == BLACK:
+            self.black |= bit
+        else:
+            self.white |= bit
+
+    def clear(self, col, row):
+        bit = ~(1 << (col * self.stride + row))
+        self.black &= bit
+        self.white &= bit
+
+    def copy(self):
+        board = BitBoard(self.size)
+        board.black = self.black
+        board.white = self.white
+        return board
+
+    def swapped(self):
+        # 黑白互换，只需交换两个整数
+        board = BitBoard(self.size)
+        board.black = self.white
+        board.white = self.black
+        return board
+
+    def run_length(self, col, row, dx, dy, player):
+        # 经过(col, row)的一条线上，player的连续棋子数（包括该点本身）
+        bits = self.stones(player)
+        shift = dx * self.stride + dy
+        index = col * self.stride + row
+        count = 1
+        i = index + shift
+        while i >= 0 and bits >> i & 1:
+            count += 1
+            i += shift
+        i = index - shift
+        while i >= 0 and bits >> i & 1:
+            count += 1
+            i -= shift
+        return count
+
+    def has_five(self, player):
+        # 任意方向上有连续五子
+        bits = self.stones(player)
+        for shift in self.masks.shifts:
+            m = bits & (bits >> shift)
+            m &= m >> (2 * shift)
+            if m & (bits >> (4 * shift)):
+                return True
+        return False
+
+    def threat_cells(self, player, count):
+        # 落在某个五格窗口里的空位：窗口完整在棋盘上、没有对方棋子、恰好有count个player的棋子
+        # count=4时落下即成五，count=3时落下即成四
+        mine = self.stones(player)
+        theirs = self.white if player == BLACK else self.black
+        full = self.masks.full
+        ret = 0
+        for shift in self.masks.shifts:
+            # 逐位累加窗口内的棋子数（ones、twos、fours三位计数）
+            ones = twos = fours = blocked = 0
+            valid = full
+            for k in range(5):
+                x = mine >> (k * shift)
+                carry = ones & x
+                ones ^= x
+                fours |= twos & carry
+                twos ^= carry
+                blocked |= theirs >> (k * shift)
+                valid &= full >> (k * shift)
+            if count == 4:
+                windows = fours & ~ones & ~twos
+            else:
+                windows = ones & twos & ~fours
+            windows &= valid & ~blocked
+            for k in range(5):
+                ret |= windows << (k * shift)
+        return ret & full & ~(mine | theirs)
+
+    def neighbours(self, radius=1):
+        # 与已有棋子距离不超过radius的空位
+        full = self.masks.full
+        occupied = self.black | self.white
+        m = occupied
+        for _ in range(radius):
+            m = (m | (m << 1) | (m >> 1)) & full
+            m = (m | (m << self.stride) | (m >> self.stride)) & full
+        return m & ~occupied
+
+    def empties(self):
+        return self.masks.full & ~(self.black | self.white)
+
+    def cells(self, mask):
+        # 按位序遍历掩码中的格子
+        stride = self.stride
+        while mask:
+            low = mask & -mask
+            yield divmod(low.bit_length() - 1, stride)
+            mask ^= low
+
+    def line(self, col, row, dx, dy):
+        # 经过(col, row)的整条线，从线的一端开始
+        while self.inside(col - dx, row - dy):
+            col -= dx
+            row -= dy
+        ret = []
+        while self.inside(col, row):
+            ret.append(self.get(col, row))
+            col += dx
+            row += dy
+        return ret
@@ -0,0 +1,232 @@
+# 开局库：以对称归一化后的局面哈希为键，存成按键排序的定长记录，启动时直接内存映射
+# 文件格式：16字节文件头（魔数、棋盘大小、记录数），之后每条记录16字节：
+#   键(uint64) 着法(uint16，归一化坐标系下的位序) 次数(uint16) 得分(int32)
+# 同一个键可以有多条记录（多个候选着法）
+import mmap
+import os
+import struct
+from .bitboard import SIZE, BLACK, WHITE
+from .transposition import zobrist
+
+MAGIC = b"GOBOOK1\0"
+HEADER = struct.Struct("<8sII")
+RECORD = struct.Struct("<QHHi")
+KEY = struct.Struct("<Q")
+
+
+def transform(t, col, row, size):
+    # 棋盘的8种对称（旋转、翻转），t为0～7
+    n = size - 1
+    return (
+        (col, row),
+        (n - row, col),
+        (n - col, n - row),
+        (row, n - col),
+        (n - col, row),
+        (col, n - row),
+        (row, col),
+        (n - row, n - col),
+    )[t]
+
+
+# 每种对称的逆变换：旋转90度与旋转270度互逆，其余的逆变换是自身
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+def canonical(stones, player, size=SIZE):
+    # stones为[(col, row, player)]，返回 (8种对称下最小的哈希, 取到最小值的对称)
+    keys = zobrist(size)
+    stride = size + 1
+    best = None
+    for t in range(8):
+        h = keys.side if player == BLACK else 0
+        for col, row, p in stones:
+            x, y = transform(t, col, row, size)
+            h ^= keys.key(p, x * stride + y)
+        if best is None or h < best[0]:
+            best = (h, t)
+    return best
+
+
+class Book:
+    def __init__(self, path) -> None:
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件不能映射
+            self.file.close()
+            raise ValueError(f"开局库文件无效: {path}")
+        magic, self.size, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"开局库文件无效: {path}")
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def find(self, key):
+        # 二分查找第一条键不小于key的记录
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(self.data, HEADER.size + mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def records(self, key):
+        i = self.find(key)
+        while i < self.count:
+            record = RECORD.unpack_from(self.data, HEADER.size + i * RECORD.size)
+            if record[0] != key:
+                break
+            yield record
+            i += 1
+
+    def probe(self, stones, player):
+        # 返回 [((col, row), 次数, 得分)]，坐标已换回实际棋盘
+        key, t = canonical(stones, player, self.size)
+        stride = self.size + 1
+        ret = []
+        for _, move, count, score in self.records(key):
+            col, row = divmod(move, stride)
+            ret.append((transform(INVERSE[t], col, row, self.size), count, score))
+        return ret
+
+    def move(self, board, player):
+        # 库里得分最高（同分取次数多）且仍为空位的着法，没有则返回None
+        if board.size != self.size:
+            return None
+        moves = [
+            (score, count, pos)
+            for pos, count, score in self.probe(board.moves, player)
+            if board.is_empty(*pos)
+        ]
+        if not moves:
+            return None
+        return max(moves, key=lambda m: (m[0], m[1]))[2]
+
+
+def load(path):
+    # 文件不存在时返回None，不用开局库
+    if not os.path.exists(path):
+        return None
+    return Book(path)
+
+
+def read(path):
+    # 读出整个开局库：(棋盘大小, {(键, 着法): [次数, 得分]})
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, size, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"开局库文件无效: {path}")
+    entries = {}
+    for i in range(count):
+        key, move, n, score = RECORD.unpack_from(data, HEADER.size + i * RECORD.size)
+        entries[(key, move)] = [n, score]
+    return size, entries
+
+
+def write(path, size, entries):
+    # entries: {(键, 着法): [次数, 得分]}，按键排序后写出
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, size, len(entries)))
+        for (key, move), (count, score) in sorted(entries.items()):
+            count = min(count, 0xFFFF)
+            score = max(-(1 << 31), min(score, (1 << 31) - 1))
+            f.write(RECORD.pack(key, move, count, score))
+
+
+def add(entries, stones, player, col, row, size=SIZE, count=1, score=0):
+    # 把"stones局面下player走(col, row)"记入entries，坐标换到归一化坐标系
+    key, t = canonical(stones, player, size)
+    x, y = transform(t, col, row, size)
+    entry = entries.setdefault((key, x * (size + 1) + y), [0, 0])
+    entry[0] += count
+    entry[1] += score
+
+
+def record(entries, steps, winner, plies, size=SIZE):
+    # 对局记录steps为[(col, row, player)]，记下前plies步；赢家走的着法得分+1，输家-1
+    stones = []
+    for col, row, player in steps[:plies]:
+        score = 0 if winner is None else (1 if winner == player else -1)
+        add(entries, stones, player, col, row, size, 1, score)
+        stones.append((col, row, player))
+
+
+def analyse(entries, searcher, plies, branch, size=SIZE):
+    # 从空棋盘开始，每个局面记下引擎选的着法，并沿候选点中最好的branch个继续展开
+    from .position import Position
+
+    board = Position(size, searcher.radius)
+    seen = set()
+
+    def expand(player, ply):
+        key = canonical(board.moves, player, size)[0]
+        if ply >= plies or key in seen:
+            return
+        seen.add(key)
+        col, row = searcher.search(board, player)
+        add(entries, board.moves, player, col, row, size, 1, searcher.value)
+        children = [(col, row)] + [
+            m[3] for m in searcher.candidates(board, player) if m[3] != (col, row)
+        ]
+        opponent = BLACK if player == WHITE else WHITE
+        for col, row in children[:branch]:
+            try:
+                if not board.make(col, row, player):
+                    expand(opponent, ply + 1)
+            finally:
+                board.unmake()
+
+    expand(BLACK, 0)
+    return len(seen)
+
+
+if __name__ == "__main__":
+    # 生成或扩充开局库：
+    #   python -m engine.book data/book.bin --games games.jsonl   从对局记录
+    #   python -m engine.book data/book.bin --analyse 4           用引擎分析前4步
+    # 对局记录每行一局，JSON格式：{"steps": [[col, row, player], ...], "winner": 1}，
+    # 或者直接是steps列表（不计胜负）
+    import argparse
+    import json
+    from .search import Searcher
+
+    parser = argparse.ArgumentParser(description="生成或扩充开局库")
+    parser.add_argument("book", help="开局库文件，已存在时在原有内容上扩充")
+    parser.add_argument("--games", nargs="*", default=[], help="对局记录文件")
+    parser.add_argument("--plies", type=int, default=12, help="对局记录只取前几步")
+    parser.add_argument("--analyse", type=int, default=0, help="引擎分析的步数")
+    parser.add_argument("--branch", type=int, default=3, help="引擎分析时每个局面展开的着法数")
+    parser.add_argument("--time", type=float, default=1.0, help="引擎分析每步的思考时间（秒）")
+    parser.add_argument("--size", type=int, default=SIZE)
+    args = parser.parse_args()
+
+    size, entries = args.size, {}
+    if os.path.exists(args.book):
+        size, entries = read(args.book)
+    games = 0
+    for path in args.games:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                game = json.loads(line)
+                if isinstance(game, list):
+                    game = {"steps": game}
+                steps = [tuple(step) for step in game["steps"]]
+                record(entries, steps, game.get("winner"), args.plies, size)
+                games += 1
+    positions = 0
+    if args.analyse:
+        searcher = Searcher(time_limit=args.time)
+        positions = analyse(entries, searcher, args.analyse, args.branch, size)
+    write(args.book, size, entries)
+    print(f"对局{games}局，分析局面{positions}个，开局库共{len(entries)}条")
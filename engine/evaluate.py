@@ -0,0 +1,398 @@
+# 棋型评分
+# get_line_score/get_score是逐条线做子串查找的原始实现，作为其它实现的对照
+# line_features把一条线归纳成几个棋型标志，combine再把四条线的标志按权重合成得分，默认权重下结果与get_line_score完全相同
+import json
+import os
+from functools import lru_cache
+
+# line_features返回值的各个标志位
+FIVE = 1  # 连五
+LIVE_FOUR = 2  # 活四
+RUSH_FOUR = 4  # 冲四
+LIVE_THREE = 8  # 活三
+SLEEP_THREE_FIRST = 16  # 活三眠三只检查了眠三的第一个棋型
+SLEEP_THREE = 32  # 眠三
+LIVE_TWO = 64  # 活二
+SLEEP_TWO = 128  # 眠二
+DEAD_SHIFT = 8  # 第8位起是死四、死三、死二的个数（0～3）
+
+RUSH_FOURS = ["022221", "122220", "20222", "22202", "22022"]
+LIVE_THREES = ["02220", "2022", "2202"]
+SLEEP_THREES = [
+    "002221",
+    "122200",
+    "020221",
+    "122020",
+    "022021",
+    "120220",
+    "20022",
+    "22002",
+    "20202",
+    "1022201",
+]
+LIVE_TWOS = ["002200", "02020", "2002"]
+SLEEP_TWOS = [
+    "000221",
+    "122000",
+    "002021",
+    "120200",
+    "020021",
+    "120020",
+    "20002",
+]
+DEADS = ["122221", "12221", "1221"]
+
+
+def get_line_score(line):
+    # 连五 ： 100000, 活四，双冲四，冲四活三 ： 10000, 双活三 ： 5000, 活三眠三 ： 1000
+    # 眠四 ： 500, 活三 ： 200, 双活二 ： 100, 眠三 ： 50, 活二眠二 ： 10, 活二 ： 5
+    # 眠二 ：3, 死四 ： -5, 死三 ： -5, 死二 ： -5
+
+    score = 0
+
+    # 连五
+    for i in line:
+        if i.find("22222") != -1:
+            score += 100000
+            break
+
+    # 活四
+    for i in line:
+        if i.find("022220") != -1:
+            score += 50000
+            break
+
+    # 双冲四
+    count = 0
+    for i in line:
+        for size in ["022221", "122220", "20222", "22202", "22022"]:
+            if i.find(size) != -1:
+                count += 1
+                break
+
+        if count == 2:
+            score += 10000
+            break
+
+    # 冲四活三
+    ft = [0, 0]
+    for i in line:
+        if not ft[0]:
+            for size in ["022221", "122220", "20222", "22202", "22022"]:
+                if i.find(size) != -1:
+                    ft[0] = 1
+                    break
+
+        if not ft[1]:
+            for size in ["02220", "2022", "2202"]:
+                if i.find(size) != -1:
+                    ft[1] = 1
+                    break
+
+        if ft[0] and ft[1]:
+            score += 10000
+            break
+
+    # 双活三
+    count = 0
+    for i in line:
+        for size in ["02220", "2022", "2202"]:
+            if i.find(size) != -1:
+                count += 1
+                break
+
+        if count == 2:
+            score += 10000
+            break
+
+    # 活三眠三
+    tt = [0, 0]
+    for i in line:
+        if not tt[0]:
+            for size in ["02220", "2022", "2202"]:
+                if i.find(size) != -1:
+                    tt[0] = 1
+                    break
+
+        if not tt[1]:
+            for size in [
+                "002221",
+                "122200",
+                "020221",
+                "122020",
+                "022021",
+                "120220",
+                "20022",
+                "22002",
+                "20202",
+                "1022201",
+            ]:
+                if i.find(size) != -1:
+                    tt[1] = 1
+                break
+
+        if tt[0] and tt[1]:
+            score += 1000
+            break
+
+    # 眠四
+
+    # 活三
+    count = 0
+    for i in line:
+        for size in ["02220", "2022", "2202"]:
+            if i.find(size) != -1:
+                count += 1
+                break
+    score += count * 200
+
+    # 双活二
+    count = 0
+    for i in line:
+        for size in ["002200", "02020", "2002"]:
+            if i.find(size) != -1:
+                count += 1
+                break
+        if count == 2:
+            score += 100
+            break
+
+    # 眠三
+    count = 0
+    for i in line:
+        for size in [
+            "002221",
+            "122200",
+            "020221",
+            "122020",
+            "022021",
+            "120220",
+            "20022",
+            "22002",
+            "20202",
+            "1022201",
+        ]:
+            if i.find(size) != -1:
+                count += 1
+                break
+    score += count * 50
+
+    # 活二眠二
+    dd = [0, 0]
+    for i in line:
+        if not dd[0]:
+            for size in ["002200", "02020", "2002"]:
+                if i.find(size) != -1:
+                    dd[0] = 1
+                    break
+
+        if not dd[1]:
+            for size in [
+                "000221",
+                "122000",
+                "002021",
+                "120200",
+                "020021",
+                "120020",
+                "20002",
+            ]:
+                if i.find(size) != -1:
+                    dd[1] = 1
+                    break
+
+        if dd[0] and dd[1]:
+            score += 10
+            break
+
+    # 活二
+    count = 0
+    for i in line:
+        for size in ["002200", "02020", "2002"]:
+            if i.find(size) != -1:
+                count += 1
+                break
+    score += count * 5
+
+    # 眠二
+    count = 0
+    for i in line:
+        for size in [
+            "000221",
+            "122000",
+            "002021",
+            "120200",
+            "020021",
+            "120020",
+            "20002",
+        ]:
+            if i.find(size) != -1:
+                count += 1
+                break
+    score += count * 3
+
+    # 死四，死三，死二
+    count = 0
+    for i in line:
+        if i.find("122221") != -1:
+            count += 1
+        if i.find("12221") != -1:
+            count += 1
+        if i.find("1221") != -1:
+            count += 1
+    score += count * -5
+
+    return score
+
+
+def get_score(pos, board):
+    # 在位棋盘上临时落子，取出经过该点的四条线后再撤销
+    board.set(pos[0], pos[1], 2)
+    line = [
+        "".join(map(str, board.line(pos[0], pos[1], dx, dy)))
+        for dx, dy in [(0, 1), (1, 0), (1, 1), (1, -1)]
+    ]  # 横，竖，左斜，右斜
+    board.clear(pos[0], pos[1])
+
+    return get_line_score(line)
+
+
+@lru_cache(maxsize=1 << 16)
+def line_features(line):
+    # 一条线（以2为己方的字符串）里出现了哪些棋型
+    ret = 0
+    if "22222" in line:
+        ret |= FIVE
+    if "022220" in line:
+        ret |= LIVE_FOUR
+    if any(p in line for p in RUSH_FOURS):
+        ret |= RUSH_FOUR
+    if any(p in line for p in LIVE_THREES):
+        ret |= LIVE_THREE
+    if SLEEP_THREES[0] in line:
+        ret |= SLEEP_THREE_FIRST
+    if any(p in line for p in SLEEP_THREES):
+        ret |= SLEEP_THREE
+    if any(p in line for p in LIVE_TWOS):
+        ret |= LIVE_TWO
+    if any(p in line for p in SLEEP_TWOS):
+        ret |= SLEEP_TWO
+    return ret | (sum(p in line for p in DEADS) << DEAD_SHIFT)
+
+
+# combine的各项：名称与默认权重，默认权重与get_line_score完全相同
+# 原实现里眠四一项是空的（权重0）；双活三的注释写5000，代码里是10000，这里以代码为准
+FEATURES = (
+    "five",  # 连五
+    "live_four",  # 活四
+    "double_rush_four",  # 双冲四
+    "rush_four_live_three",  # 冲四活三
+    "double_live_three",  # 双活三
+    "live_three_sleep_three",  # 活三眠三（只检查眠三的第一个棋型）
+    "rush_four",  # 眠四（冲四的方向数）
+    "live_three",  # 活三的方向数
+    "double_live_two",  # 双活二
+    "sleep_three",  # 眠三的方向数
+    "live_two_sleep_two",  # 活二眠二
+    "live_two",  # 活二的方向数
+    "sleep_two",  # 眠二的方向数
+    "dead",  # 死四、死三、死二的个数
+)
+DEFAULT_WEIGHTS = {
+    "five": 100000,
+    "live_four": 50000,
+    "double_rush_four": 10000,
+    "rush_four_live_three": 10000,
+    "double_live_three": 10000,
+    "live_three_sleep_three": 1000,
+    "rush_four": 0,
+    "live_three": 200,
+    "double_live_two": 100,
+    "sleep_three": 50,
+    "live_two_sleep_two": 10,
+    "live_two": 5,
+    "sleep_two": 3,
+    "dead": -5,
+}
+# 连五、活四决定胜负，搜索里按固定分数判断，调参时不改
+FIXED = ("five", "live_four")
+# 搜索按得分给落子点分级：能成五的点不低于FIVE_SCORE；活四、双冲四、冲四活三、双活三不低于
+# THREAT_SCORE。各项权重相加后不能越级，combine把其余的点限制在下一级以内
+FIVE_SCORE = DEFAULT_WEIGHTS["five"]
+THREAT_SCORE = 10000
+# 启动时自动加载的权重文件
+WEIGHTS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "weights.json"
+)
+
+weights = [DEFAULT_WEIGHTS[name] for name in FEATURES]
+_combined = {}
+
+
+def use(new):
+    # 换一组权重（{名称: 权重}，缺的项取默认值），已缓存的得分作废
+    weights[:] = [int(new.get(name, DEFAULT_WEIGHTS[name])) for name in FEATURES]
+    for name in FIXED:
+        weights[FEATURES.index(name)] = DEFAULT_WEIGHTS[name]
+    _combined.clear()
+
+
+def load(path=WEIGHTS_PATH):
+    # 读取权重文件，文件不存在时返回False，保持当前权重
+    if not os.path.exists(path):
+        return False
+    with open(path, encoding="utf-8") as f:
+        use(json.load(f))
+    return True
+
+
+def features(a, b, c, d):
+    # 四个方向的棋型标志 -> 与FEATURES一一对应的各项个数
+    any_ = a | b | c | d
+
+    def count(flag):
+        return (a & flag != 0) + (b & flag != 0) + (c & flag != 0) + (d & flag != 0)
+
+    rush_four = count(RUSH_FOUR)
+    live_three = count(LIVE_THREE)
+    live_two = count(LIVE_TWO)
+    return (
+        1 if any_ & FIVE else 0,
+        1 if any_ & LIVE_FOUR else 0,
+        1 if rush_four >= 2 else 0,
+        1 if rush_four and live_three else 0,
+        1 if live_three >= 2 else 0,
+        1 if live_three and any_ & SLEEP_THREE_FIRST else 0,
+        rush_four,
+        live_three,
+        1 if live_two >= 2 else 0,
+        count(SLEEP_THREE),
+        1 if live_two and any_ & SLEEP_TWO else 0,
+        live_two,
+        count(SLEEP_TWO),
+        sum(f >> DEAD_SHIFT for f in (a, b, c, d)),
+    )
+
+
+def bound(score, f):
+    # 没有成五的点低于FIVE_SCORE，也没有成杀棋型的点低于THREAT_SCORE；默认权重下不起作用
+    if not f[0]:
+        score = min(score, FIVE_SCORE - 1)
+        if not (f[1] or f[2] or f[3] or f[4]):
+            score = min(score, THREAT_SCORE - 1)
+    return score
+
+
+def combine(a, b, c, d):
+    # 四个方向的棋型标志合成落子得分，默认权重下与get_line_score的各项一一对应
+    key = (a, b, c, d)
+    score = _combined.get(key)
+    if score is not None:
+        return score
+    f = features(a, b, c, d)
+    score = bound(sum(w * x for w, x in zip(weights, f)), f)
+    if len(_combined) < 1 << 16:
+        _combined[key] = score
+    return score
+
+
+load()
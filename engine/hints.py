@@ -0,0 +1,136 @@
+# 落子提示：在后台线程里对当前局面做多主变搜索（每个候选点都搜出准确分数），逐层加深，
+# 每搜完一层就更新前几名，时间越长提示越准；界面每帧用poll()取最新结果，不在绘制时计算
+# 落子或悔棋后旧的提示立即作废；搜过的局面按哈希记下结果，悔棋回到原局面时马上就有提示，
+# 置换表跨局面保留，新局面的浅层几乎不用重新搜索
+import threading
+import time
+from .bitboard import BLACK, WHITE
+from .renju import FREESTYLE
+from .search import Searcher, Timeout, order, WIN
+
+YIELD = 7  # 每搜8个节点让出一次GIL，界面线程不必等满一个切换间隔（5毫秒），保持60帧
+
+
+class HintSearcher(Searcher):
+    def check(self):
+        super().check()
+        if self.nodes & YIELD == 0:
+            time.sleep(0)
+
+
+class Hinter:
+    def __init__(
+        self,
+        count=5,
+        time_limit=10.0,
+        width=10,
+        max_depth=10,
+        rule=FREESTYLE,
+        notify=None,
+    ) -> None:
+        self.count = count  # 提示几个点
+        self.notify = notify  # 提示更新时在搜索线程里调用，界面用它唤醒主循环
+        self.time_limit = time_limit  # 每个局面最多搜索的秒数
+        self.searcher = HintSearcher(
+            time_limit=None, width=width, max_depth=max_depth, solver=False, rule=rule
+        )
+        self.condition = threading.Condition()
+        self.job = None  # (局面副本, 轮到谁走)
+        self.generation = 0
+        self.hints = None  # (深度, [(着法, 分数)])，深度为0时分数是一层的评分
+        self.known = {}  # (局面哈希, 轮到谁走) -> 搜得最深的hints
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def show(self, board, player):
+        # 局面变了（落子、悔棋、新的一局）时调用，开始为player计算提示
+        key = (board.hash, player)
+        with self.condition:
+            self.generation += 1
+            self.hints = self.known.get(key)
+            self.job = (board.copy(), player)
+            self.searcher.stopped = True
+            self.condition.notify()
+
+    def hide(self):
+        # 关闭提示，停止后台搜索
+        with self.condition:
+            self.generation += 1
+            self.hints = None
+            self.job = None
+            self.searcher.stopped = True
+
+    def poll(self):
+        with self.condition:
+            return self.hints
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.job = None
+            self.searcher.stopped = True
+            self.condition.notify()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.job is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                board, player = self.job
+                self.job = None
+                generation = self.generation
+                self.searcher.stopped = False
+            self.multipv(board, player, generation)
+
+    def publish(self, key, generation, depth, hints):
+        with self.condition:
+            if generation != self.generation:
+                return
+            if self.hints is not None and depth <= self.hints[0]:
+                return
+            self.hints = (depth, hints)
+            if len(self.known) >= 4096:
+                self.known.clear()
+            self.known[key] = self.hints
+        if self.notify is not None:
+            self.notify()
+
+    def multipv(self, board, player, generation):
+        # 根节点每个候选点都用完整窗口搜索，得到准确分数再排序，前count个就是提示
+        searcher = self.searcher
+        opponent = BLACK if player == WHITE else WHITE
+        key = (board.hash, player)
+        searcher.nodes = 0
+        searcher.deadline = time.perf_counter() + self.time_limit
+        searcher.tt.new_search()
+        moves = order(searcher.candidates(board, player))
+        if not moves:
+            self.publish(key, generation, 0, [])
+            return
+        self.publish(key, generation, 0, [(m[3], m[0]) for m in moves[: self.count]])
+        root = [m[3] for m in moves[: max(searcher.width, self.count)]]
+        for depth in range(1, searcher.max_depth + 1):
+            scored = []
+            try:
+                for col, row in root:
+                    try:
+                        if board.make(col, row, player):
+                            value = WIN
+                        else:
+                            value = -searcher.negamax(
+                                board, opponent, depth - 1, -WIN - 1, WIN + 1, 1
+                            )
+                    finally:
+                        board.unmake()
+                    scored.append(((col, row), value))
+            except Timeout:
+                return
+            scored.sort(key=lambda s: -s[1])
+            root = [move for move, _ in scored]
+            self.publish(key, generation, depth, scored[: self.count])
+            if abs(scored[0][1]) >= WIN - searcher.max_depth:
+                return
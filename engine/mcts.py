@@ -0,0 +1,277 @@
+# 蒙特卡洛树搜索：PUCT选择，先验概率取自棋型得分；模拟对局只在候选点里走，
+# 按棋型得分挑着法，走若干步后用静态评估收尾。搜索前的开局库、必胜/必防判断与Searcher相同
+# 同一局里保留上一步的搜索树，workers大于1时每个进程各自建树（根节点并行），最后合并访问次数
+import math
+import os
+import random
+import time
+from .bitboard import BLACK, WHITE
+from .search import Searcher, Timeout, order, threat
+from .parallel import snapshot, restore, gather
+
+SCALE = 1000  # 静态评估换算成胜率时的尺度，分差1000约为73%
+SIMULATIONS = 1000
+
+_worker = None
+
+
+class Node:
+    __slots__ = ("move", "player", "prior", "children", "visits", "wins", "winner")
+
+    def __init__(self, move, player, prior) -> None:
+        self.move = move  # 走到这个节点的着法
+        self.player = player  # 走这步的一方
+        self.prior = prior
+        self.children = None  # None为还没展开
+        self.visits = 0
+        self.wins = 0.0  # 从player的角度累计的得分，胜1、负0、和0.5
+        self.winner = False  # 这步直接成五
+
+
+class MCTS(Searcher):
+    def __init__(
+        self,
+        time_limit=0.2,
+        node_limit=None,
+        width=10,
+        c_puct=1.5,
+        playout_depth=8,
+        playout_width=3,
+        batch=2,
+        workers=1,
+        seed=None,
+        tt_mb=1,
+        **options,
+    ) -> None:
+        # MCTS不用置换表，只留一张很小的给Searcher的准备阶段
+        super().__init__(
+            time_limit=time_limit,
+            node_limit=node_limit,
+            width=width,
+            tt_mb=tt_mb,
+            **options,
+        )
+        self.c_puct = c_puct
+        self.playout_depth = playout_depth  # 模拟对局最多走几步，之后用静态评估
+        self.playout_width = playout_width  # 模拟对局在得分最高的几个点里随机挑
+        self.batch = batch  # 每个叶子连续模拟几局
+        self.random = random.Random(seed)
+        self.tree = None  # (根节点的着法序列, 根节点)，下一步时复用
+        self.playouts = 0
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        if self.workers > 1:
+            # 与ParallelSearcher相同，用到进程池时才导入
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            context = multiprocessing.get_context()
+            self.stop = context.RawValue("b", 0)  # 被打断时通知工作进程
+            options = dict(
+                options,
+                time_limit=time_limit,
+                node_limit=node_limit,
+                width=width,
+                c_puct=c_puct,
+                playout_depth=playout_depth,
+                playout_width=playout_width,
+                batch=batch,
+                solver=False,
+                book=None,
+            )
+            self.pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=context,
+                initializer=_init,
+                initargs=(options, self.stop),
+            )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def expand(self, node, board, player):
+        # 先验概率与 进攻分 + 防守分 成正比；能成五时只留成五，对方能成五时只留堵点
+        moves = order(self.candidates(board, player))[: self.width]
+        if moves and threat(moves[0]) == 0:
+            moves = moves[:1]
+        weights = [max(m[0], 0) + 1 for m in moves]
+        total = sum(weights)
+        node.children = [
+            Node(m[3], player, w / total) for m, w in zip(moves, weights)
+        ]
+
+    def select(self, node):
+        c = self.c_puct * math.sqrt(node.visits + 1)
+        best = None
+        best_u = -1.0
+        for child in node.children:
+            q = child.wins / child.visits if child.visits else 0.5
+            u = q + c * child.prior / (1 + child.visits)
+            if u > best_u:
+                best = child
+                best_u = u
+        return best
+
+    def playout(self, board, player):
+        # 从当前局面模拟，返回轮到player一方的得分
+        me = player
+        made = 0
+        try:
+            for _ in range(self.playout_depth):
+                self.check()
+                moves = order(self.candidates(board, player))
+                if not moves:
+                    return 0.5
+                if threat(moves[0]) == 0:
+                    return 1.0 if player == me else 0.0
+                if threat(moves[0]) < 4:
+                    # 堵成五或有杀棋时照着走，否则在得分最高的几个点里按分数随机
+                    move = moves[0][3]
+                else:
+                    top = moves[: self.playout_width]
+                    move = self.random.choices(
+                        [m[3] for m in top], [max(m[0], 0) + 1 for m in top]
+                    )[0]
+                board.make(move[0], move[1], player)
+                made += 1
+                player = BLACK if player == WHITE else WHITE
+            x = self.evaluate(self.candidates(board, player)) / SCALE
+            value = 1 / (1 + math.exp(-max(-50, min(50, x))))
+            return value if player == me else 1 - value
+        finally:
+            for _ in range(made):
+                board.unmake()
+
+    def simulate(self, board, root, player):
+        # 一次选择、展开、模拟、回传
+        node = root
+        path = [root]
+        made = 0
+        try:
+            while node.children and not node.winner:
+                node = self.select(node)
+                self.check()
+                if board.make(node.move[0], node.move[1], player):
+                    node.winner = True
+                made += 1
+                path.append(node)
+                player = BLACK if player == WHITE else WHITE
+            if node.winner:
+                value = 1.0  # 对走这步的一方
+            elif board.empty == 0:
+                value = 0.5
+            else:
+                self.expand(node, board, player)
+                value = 0.0
+                for _ in range(self.batch):
+                    value += self.playout(board, player)
+                    self.playouts += 1
+                value = 1 - value / self.batch
+        finally:
+            for _ in range(made):
+                board.unmake()
+        for n in reversed(path):
+            n.visits += 1
+            n.wins += value
+            value = 1 - value
+
+    def reuse(self, board):
+        # 上一步的搜索树里找到当前局面对应的节点
+        if self.tree is None:
+            return None
+        moves, node = self.tree
+        current = tuple(board.moves)
+        if current[: len(moves)] != moves:
+            return None
+        for col, row, _ in current[len(moves) :]:
+            if not node.children:
+                return None
+            node = next((c for c in node.children if c.move == (col, row)), None)
+            if node is None:
+                return None
+        return node
+
+    def grow(self, board, player, root):
+        # 在时间内不断模拟，返回根节点
+        opponent = BLACK if player == WHITE else WHITE
+        node = self.reuse(board)
+        if node is None or node.winner:
+            node = Node(None, opponent, 1.0)
+        # 根节点的子节点限定为准备阶段留下的候选
+        scores = {m[3]: max(m[0], 0) + 1 for m in self.candidates(board, player)}
+        total = sum(scores.get(move, 1) for move in root)
+        old = {child.move: child for child in node.children or ()}
+        node.children = [
+            old.get(move) or Node(move, player, scores.get(move, 1) / total)
+            for move in root
+        ]
+        self.tree = (tuple(board.moves), node)
+        try:
+            # 既不限时间也不限节点数时，最多模拟SIMULATIONS次
+            while (
+                self.deadline is not None
+                or self.node_limit is not None
+                or node.visits < SIMULATIONS
+            ):
+                self.simulate(board, node, player)
+        except Timeout:
+            pass
+        return node
+
+    def deepen(self, board, player, root, best):
+        # 访问次数最多的着法；value为它的胜率（0～1），depth为根节点的总访问次数
+        self.playouts = 0
+        if self.pool is None:
+            node = self.grow(board, player, root)
+            stats = {c.move: (c.visits, c.wins) for c in node.children}
+        else:
+            deadline = None
+            if self.deadline is not None:
+                deadline = time.time() + self.deadline - time.perf_counter()
+            self.stop.value = 0
+            state = snapshot(board)
+            futures = [
+                self.pool.submit(_search, state, player, root, deadline)
+                for _ in range(self.workers)
+            ]
+            stats = {}
+            for result, nodes, playouts in gather(futures, self, self.stop):
+                self.nodes += nodes
+                self.playouts += playouts
+                for move, (visits, wins) in result.items():
+                    v, w = stats.get(move, (0, 0.0))
+                    stats[move] = (v + visits, w + wins)
+        if not stats or max(v for v, _ in stats.values()) == 0:
+            return best
+        move = max(stats, key=lambda m: stats[m][0])
+        visits, wins = stats[move]
+        self.depth = sum(v for v, _ in stats.values())
+        self.value = wins / visits
+        return move
+
+
+def _init(options, halt):
+    global _worker
+    _worker = MCTS(seed=os.getpid(), **options)
+    _worker.board = None
+    _worker.halt = halt
+
+
+def _search(state, player, root, deadline):
+    # 在工作进程中建树，返回 ({着法: (访问次数, 得分)}, 节点数, 模拟局数)
+    worker = _worker
+    worker.board = restore(worker.board, state)
+    worker.nodes = 0
+    worker.playouts = 0
+    worker.stopped = False
+    worker.deadline = None
+    if deadline is not None:
+        worker.deadline = time.perf_counter() + deadline - time.time()
+    node = worker.grow(worker.board, player, root)
+    return (
+        {c.move: (c.visits, c.wins) for c in node.children},
+        worker.nodes,
+        worker.playouts,
+    )
@@ -0,0 +1,165 @@
+# 多进程根节点并行搜索：根节点候选轮流分给常驻的工作进程，每个进程对自己那份迭代加深
+# 置换表放在共享内存里，各深度的根节点alpha下界也共享，一个进程搜到好着法后其它进程马上用它剪枝
+# 工作进程在第一次搜索时启动，之后一直保留（棋型表、掩码只建一次），每步只传着法序列
+import os
+import time
+from .position import Position
+from .search import Searcher, WIN
+from .transposition import TranspositionTable
+
+POLL = 0.01  # 等工作进程时每隔多久看一次是否被打断（秒）
+
+_worker = None
+
+
+class Worker(Searcher):
+    # 工作进程里的搜索器，alpha下界读写共享数组
+    def __init__(self, bounds, **options) -> None:
+        super().__init__(**options)
+        self.bounds = bounds
+        self.board = None  # 上一次搜索的局面，下一步在它上面接着落子
+        self.results = {}
+
+    def shared(self, depth, alpha):
+        return max(alpha, self.bounds[depth])
+
+    def publish(self, depth, alpha):
+        with self.bounds.get_lock():
+            if alpha > self.bounds[depth]:
+                self.bounds[depth] = alpha
+
+    def done(self, depth, move, value):
+        self.results[depth] = (move, value)
+
+    def restore(self, snapshot):
+        self.board = restore(self.board, snapshot)
+        return self.board
+
+
+def snapshot(board):
+    return (board.size, board.radius, tuple(board.moves))
+
+
+def restore(board, snapshot):
+    # 快照为 (棋盘大小, 候选点范围, 着法序列)；与上一步的局面相比只多了几步时接着落子，不必重建
+    size, radius, moves = snapshot
+    if (
+        board is None
+        or board.size != size
+        or board.radius != radius
+        or len(board.moves) > len(moves)
+        or board.moves != list(moves[: len(board.moves)])
+    ):
+        board = Position(size, radius)
+    for col, row, player in moves[len(board.moves) :]:
+        board.place(col, row, player)
+    return board
+
+
+def gather(futures, searcher, halt):
+    # 等所有工作进程返回；searcher被打断（stopped）时置共享的halt，工作进程尽快结束
+    from concurrent.futures import wait
+
+    pending = futures
+    while pending:
+        _, pending = wait(pending, timeout=POLL)
+        if searcher.stopped:
+            halt.value = 1
+    return [future.result() for future in futures]
+
+
+def _init(table, mb, bounds, halt, options):
+    global _worker
+    _worker = Worker(bounds, **options)
+    _worker.tt = TranspositionTable(mb, table)
+    _worker.halt = halt
+
+
+def _search(snapshot, player, root, deadline, age):
+    # 在工作进程中对一部分根节点候选迭代加深，返回 ({深度: (着法, 分数)}, 节点数)
+    worker = _worker
+    board = worker.restore(snapshot)
+    worker.nodes = 0
+    worker.results = {}
+    # 各进程的perf_counter不可比，截止时间用time.time()传递
+    worker.deadline = None
+    if deadline is not None:
+        worker.deadline = time.perf_counter() + deadline - time.time()
+    worker.tt.age = age
+    worker.deepen(board, player, root, root[0])
+    return worker.results, worker.nodes
+
+
+class ParallelSearcher(Searcher):
+    def __init__(self, workers=None, **options) -> None:
+        # workers为工作进程数，默认为CPU核数；为1时与Searcher相同，不启动进程
+        super().__init__(**options)
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        if self.workers > 1:
+            # 只用一个进程时不导入multiprocessing，命令行引擎启动更快
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            context = multiprocessing.get_context()
+            mb = options.get("tt_mb", 16)
+            table = context.RawArray("b", TranspositionTable.size(mb))
+            self.tt = TranspositionTable(mb, table)
+            self.bounds = context.Array("q", self.max_depth + 1)
+            self.stop = context.RawValue("b", 0)
+            # 书、威胁空间搜索只在主进程里用；工作进程的置换表换成共享的那张
+            options = dict(options, solver=False, book=None, tt_mb=0)
+            self.pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=context,
+                initializer=_init,
+                initargs=(table, mb, self.bounds, self.stop, options),
+            )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def deepen(self, board, player, root, best):
+        if self.pool is None or len(root) < 2:
+            return super().deepen(board, player, root, best)
+        with self.bounds.get_lock():
+            for depth in range(len(self.bounds)):
+                self.bounds[depth] = -WIN - 1
+        self.stop.value = 0
+        state = snapshot(board)
+        deadline = None
+        if self.deadline is not None:
+            deadline = time.time() + self.deadline - time.perf_counter()
+        # 轮流分配，每个进程都分到排序靠前的候选
+        count = min(self.workers, len(root))
+        futures = [
+            self.pool.submit(
+                _search, state, player, root[i::count], deadline, self.tt.age
+            )
+            for i in range(count)
+        ]
+        results = []
+        for result, nodes in gather(futures, self, self.stop):
+            results.append(result)
+            self.nodes += nodes
+
+        # 有进程证明了必胜就直接走
+        for result in results:
+            for move, value in result.values():
+                if move is not None and value >= WIN - self.max_depth:
+                    self.value = value
+                    return move
+        # 所有进程都搜完的最深一轮里，分数最高的着法
+        depth = min(max(result, default=0) for result in results)
+        if depth == 0:
+            return best
+        move, value = max(
+            (result[depth] for result in results if result[depth][0] is not None),
+            key=lambda r: r[1],
+            default=(best, self.value),
+        )
+        self.depth = depth
+        self.value = value
+        return move
@@ -0,0 +1,150 @@
+# 棋型查表：导入时把evaluate里的棋型编译成以7格窗口为下标的表，分类一条线只需一遍扫描
+# 格子编码：0空、1黑、2白、3线外；窗口第i格占第2i、2i+1位
+# TABLES[player][code]：从窗口第0格开始出现了哪些棋型（player为己方），与evaluate.line_features的标志位一致，
+# 死四、死三、死二各占一位（第8～10位），最后再换算成个数
+from .bitboard import BLACK, WHITE, DIRECTIONS
+from .evaluate import (
+    FIVE,
+    LIVE_FOUR,
+    RUSH_FOUR,
+    LIVE_THREE,
+    SLEEP_THREE_FIRST,
+    SLEEP_THREE,
+    LIVE_TWO,
+    SLEEP_TWO,
+    DEAD_SHIFT,
+    RUSH_FOURS,
+    LIVE_THREES,
+    SLEEP_THREES,
+    LIVE_TWOS,
+    SLEEP_TWOS,
+    DEADS,
+    combine,
+)
+
+WINDOW = 7  # 最长的棋型"1022201"有7格
+MASK = (1 << (2 * WINDOW)) - 1
+BORDERS = MASK  # 每格都是3（线外）的窗口
+
+# 每个标志对应的棋型
+PATTERNS = [
+    (FIVE, ["22222"]),
+    (LIVE_FOUR, ["022220"]),
+    (RUSH_FOUR, RUSH_FOURS),
+    (LIVE_THREE, LIVE_THREES),
+    (SLEEP_THREE_FIRST, SLEEP_THREES[:1]),
+    (SLEEP_THREE, SLEEP_THREES),
+    (LIVE_TWO, LIVE_TWOS),
+    (SLEEP_TWO, SLEEP_TWOS),
+] + [(1 << (DEAD_SHIFT + i), [p]) for i, p in enumerate(DEADS)]
+
+# 第8～10位中置位的个数
+DEAD_COUNT = [bin(i).count("1") for i in range(8)]
+
+
+def build(player):
+    # 棋型字符串里"2"是己方，"1"是对方
+    digit = {"0": 0, "2": player, "1": BLACK if player == WHITE else WHITE}
+    table = [0] * (MASK + 1)
+    for flag, patterns in PATTERNS:
+        for pattern in patterns:
+            code = 0
+            for i, c in enumerate(pattern):
+                code |= digit[c] << (2 * i)
+            # 棋型之后的格子任意
+            rest = WINDOW - len(pattern)
+            for tail in range(1 << (2 * rest)):
+                table[code | (tail << (2 * len(pattern)))] |= flag
+    return table
+
+
+TABLES = {BLACK: build(BLACK), WHITE: build(WHITE)}
+
+
+def window_codes(values):
+    # codes[s]：从第s格开始的窗口编码，codes[len(values)]为全在线外
+    n = len(values)
+    codes = [BORDERS] * (n + 1)
+    code = BORDERS
+    for s in range(n - 1, -1, -1):
+        code = ((code << 2) | values[s]) & MASK
+        codes[s] = code
+    return codes
+
+
+def features(flags):
+    # 把死棋型的三个位换算成个数，得到与evaluate.line_features相同的格式
+    return (flags & 0xFF) | (DEAD_COUNT[flags >> DEAD_SHIFT] << DEAD_SHIFT)
+
+
+def classify(values, player):
+    # 一条线（格子编码的列表）里出现了哪些棋型，player为己方
+    table = TABLES[player]
+    flags = 0
+    for code in window_codes(values):
+        flags |= table[code]
+    return features(flags)
+
+
+def empty_features(values, codes, player):
+    # 对线上每个空位，求player落在这里之后整条线的棋型，返回[(下标, 棋型标志)]
+    # 起点离该空位超过6格的棋型不受影响，取原线的前缀/后缀结果；其余7个窗口重新查表
+    table = TABLES[player]
+    n = len(values)
+    starts = [table[codes[s]] for s in range(n)]
+    prefix = starts[:]
+    for s in range(1, n):
+        prefix[s] |= prefix[s - 1]
+    suffix = starts + [0]
+    for s in range(n - 2, -1, -1):
+        suffix[s] |= suffix[s + 1]
+    ret = []
+    for k in range(n):
+        if values[k]:
+            continue
+        flags = suffix[k + 1]
+        if k >= WINDOW:
+            flags |= prefix[k - WINDOW]
+        for s in range(max(0, k - WINDOW + 1), k + 1):
+            flags |= table[codes[s] | (player << (2 * (k - s)))]
+        ret.append((k, features(flags)))
+    return ret
+
+
+_memo = {}
+MEMO_SIZE = 1 << 16
+
+
+def line_empty_features(values):
+    # 对线上每个空位，求黑、白分别落在这里之后整条线的棋型，返回两个与线等长的列表（有子的格为0），
+    # 调用方可以整段切片赋值
+    # 同样的线在对局和搜索中反复出现，结果按线的内容缓存，缓存满了就清空
+    key = bytes(values)
+    ret = _memo.get(key)
+    if ret is None:
+        codes = window_codes(values)
+        ret = []
+        for player in (BLACK, WHITE):
+            flags = [0] * len(values)
+            for k, f in empty_features(values, codes, player):
+                flags[k] = f
+            ret.append(flags)
+        ret = tuple(ret)
+        if len(_memo) >= MEMO_SIZE:
+            _memo.clear()
+        _memo[key] = ret
+    return ret
+
+
+def get_line_score(line):
+    # 与evaluate.get_line_score相同，line为四条以"2"为己方的字符串
+    return combine(*(classify([int(c) for c in s], WHITE) for s in line))
+
+
+def get_score(pos, board):
+    # 与evaluate.get_score相同：以白子（2）为己方，在pos落子的得分
+    board.set(pos[0], pos[1], WHITE)
+    values = [board.line(pos[0], pos[1], dx, dy) for dx, dy in DIRECTIONS]
+    board.clear(pos[0], pos[1])
+    return combine(*(classify(v, WHITE) for v in values))
+
@@ -0,0 +1,132 @@
+# 带评分缓存的棋盘，供AI搜索使用
+# cache[player][d][index]：player落在index时，沿DIRECTIONS[d]那条线的棋型标志（见patterns）
+# 落子和悔棋只重算经过该点的四条线，评估一个候选点只需查四次表
+# frontier：与已有棋子距离不超过radius的空位，落子时并入该点周围的掩码，悔棋时还原
+from .bitboard import SIZE, EMPTY, BLACK, WHITE
+from .rules import Board
+from .evaluate import combine
+from .patterns import line_empty_features
+from .transposition import zobrist
+
+_empty = {}  # 棋盘大小 -> 空棋盘的cache
+
+
+class Position(Board):
+    def __init__(self, size=SIZE, radius=1) -> None:
+        super().__init__(size)
+        count = size * self.stride
+        self.radius = radius
+        self.around = self.masks.around(radius)
+        self.frontier = 0
+        self.grid = [EMPTY] * count  # 按位序存放的各格棋子
+        self.zobrist = zobrist(size)
+        self.hash = 0
+        # 空棋盘的缓存每种尺寸只算一次，之后复制
+        if size not in _empty:
+            self.cache = {
+                BLACK: [[0] * count for _ in range(4)],
+                WHITE: [[0] * count for _ in range(4)],
+            }
+            for d in range(4):
+                for line in set(self.masks.lines[d]):
+                    if line:
+                        self.refresh(d, self.masks.slices[d][line[0]])
+            _empty[size] = self.cache
+        self.cache = {
+            player: [cache[:] for cache in _empty[size][player]]
+            for player in (BLACK, WHITE)
+        }
+        self.history = []  # 每步落子前被改写的缓存，悔棋时原样还原
+
+    def reset(self):
+        self.__init__(self.size, self.radius)
+
+    @classmethod
+    def from_board(cls, board, radius=1):
+        # 由普通的位棋盘或规则棋盘构造，有落子顺序时按顺序重放
+        position = cls(board.size, radius)
+        moves = getattr(board, "moves", None)
+        if moves:
+            for col, row, player in moves:
+                position.place(col, row, player)
+        else:
+            for player in (BLACK, WHITE):
+                for col, row in board.cells(board.stones(player)):
+                    position.place(col, row, player)
+        return position
+
+    def copy(self):
+        position = Position.__new__(Position)
+        position.__dict__.update(self.__dict__)
+        position.moves = self.moves[:]
+        position.grid = self.grid[:]
+        position.cache = {
+            player: [cache[:] for cache in self.cache[player]]
+            for player in (BLACK, WHITE)
+        }
+        position.history = self.history[:]
+        return position
+
+    def refresh(self, d, part):
+        # 重算一条线上所有空位在该方向的棋型标志；part为这条线的切片，读写整条线都不用Python循环，
+        # 每步的开销与线长、棋盘大小基本无关
+        black, white = line_empty_features(self.grid[part])
+        self.cache[BLACK][d][part] = black
+        self.cache[WHITE][d][part] = white
+
+    def place(self, col, row, player):
+        winner = super().place(col, row, player)
+        index = col * self.stride + row
+        self.grid[index] = player
+        self.hash ^= self.zobrist.key(player, index)
+        saved = [self.frontier]
+        self.frontier = (self.frontier | self.around[index]) & ~(
+            self.black | self.white
+        )
+        for d in range(4):
+            part = self.masks.slices[d][index]
+            saved.append(
+                (d, part, self.cache[BLACK][d][part], self.cache[WHITE][d][part])
+            )
+            self.refresh(d, part)
+        self.history.append(saved)
+        return winner
+
+    def undo(self):
+        col, row, player = super().undo()
+        index = col * self.stride + row
+        self.grid[index] = EMPTY
+        self.hash ^= self.zobrist.key(player, index)
+        saved = self.history.pop()
+        self.frontier = saved[0]
+        for d, part, black, white in saved[1:]:
+            self.cache[BLACK][d][part] = black
+            self.cache[WHITE][d][part] = white
+        return col, row, player
+
+    # 搜索里的叫法
+    make = place
+    unmake = undo
+
+    def candidates(self, player):
+        # 候选点 [(进攻分 + 防守分, 进攻分, 防守分, (col, row))]，按总分从高到低，同分保持位序
+        opponent = BLACK if player == WHITE else WHITE
+        mine = self.cache[player]
+        theirs = self.cache[opponent]
+        stride = self.stride
+        ret = []
+        for col, row in self.cells(self.frontier):
+            i = col * stride + row
+            attack = combine(mine[0][i], mine[1][i], mine[2][i], mine[3][i])
+            defense = combine(theirs[0][i], theirs[1][i], theirs[2][i], theirs[3][i])
+            ret.append((attack + defense, attack, defense, (col, row)))
+        ret.sort(key=lambda c: -c[0])
+        return ret
+
+    def score(self, col, row, player):
+        # player落在(col, row)的得分，等同于evaluate.get_score
+        index = col * self.stride + row
+        cache = self.cache[player]
+        return combine(
+            cache[0][index], cache[1][index], cache[2][index], cache[3][index]
+        )
@@ -0,0 +1,191 @@
+# Gomocup/Piskvork协议：从标准输入逐行读命令，向标准输出写应答，不需要图形界面
+# 坐标x为列、y为行，从0开始；BOARD命令里1为己方棋子、2为对方棋子
+import sys
+from .bitboard import BLACK, WHITE
+from .position import Position
+from .transposition import TranspositionTable, ENTRY_BYTES
+from . import ai, renju
+
+ABOUT = 'name="gobang", version="0.1.0", author="Felix-fumingzhe", country="CN"'
+MIN_TIME = 0.05  # 每步至少思考的时间（秒）
+RENJU_RULE = 4  # INFO rule的位：1恰好五连（不支持，按无禁手下）、2连续对局、4连珠
+OVERHEAD = 0.03  # 留给读写、复制局面的时间（秒）
+
+
+class Brain:
+    def __init__(self, engine="alphabeta", workers=1, opening=None, out=None) -> None:
+        self.engine = engine
+        self.workers = workers
+        self.opening = opening
+        self.rule = renju.FREESTYLE
+        self.searcher = self.create()
+        self.out = out or sys.stdout
+        self.board = None
+        self.me = BLACK
+        self.timeout_turn = 5000  # 毫秒
+        self.time_left = None  # 整局剩余时间（毫秒），None为不限
+
+    def create(self):
+        return ai.create(
+            self.engine, workers=self.workers, book=self.opening, rule=self.rule
+        )
+
+    def send(self, line):
+        self.out.write(line + "\n")
+        self.out.flush()
+
+    def budget(self):
+        # 每步思考时间：不超过每步时限，也不超过整局剩余时间的十分之一，再留出余量
+        ms = self.timeout_turn
+        if self.time_left is not None:
+            ms = min(ms, self.time_left / 10)
+        return max(MIN_TIME, ms * 0.8 / 1000 - OVERHEAD)
+
+    def think(self):
+        if not self.board.empties():
+            self.send("ERROR board is full")
+            return
+        self.searcher.time_limit = self.budget()
+        col, row = self.searcher.search(self.board, self.me)
+        self.board.place(col, row, self.me)
+        self.send(f"{col},{row}")
+
+    def parse(self, text):
+        # "x,y" -> (col, row)，不合法时返回None
+        try:
+            col, row = (int(v) for v in text.split(",")[:2])
+        except ValueError:
+            return None
+        if not self.board.inside(col, row):
+            return None
+        return col, row
+
+    def info(self, key, value):
+        try:
+            value = int(value)
+        except ValueError:
+            return
+        if key == "timeout_turn":
+            self.timeout_turn = value
+        elif key == "time_left":
+            self.time_left = value
+        elif key == "max_memory" and value and self.searcher.pool is None:
+            # 置换表不超过可用内存的一半
+            mb = value / 2 / 1024 / 1024
+            if TranspositionTable.size(mb) < self.searcher.tt.buckets * 2 * ENTRY_BYTES:
+                self.searcher.tt = TranspositionTable(mb)
+        elif key == "rule":
+            rule = renju.RENJU if value & RENJU_RULE else renju.FREESTYLE
+            if rule != self.rule:
+                # 工作进程在创建时就定下了规则，换规则要重建搜索器
+                self.rule = rule
+                old = self.searcher
+                old.close()
+                self.searcher = self.create()
+                if self.searcher.pool is None:
+                    self.searcher.tt = old.tt  # 保留按max_memory调整过的置换表
+
+    def handle(self, line, lines):
+        # 处理一行命令，lines为后续输入（BOARD命令要继续读）；返回False表示结束
+        parts = line.strip().split(" ", 1)
+        command = parts[0].upper()
+        arg = parts[1].strip() if len(parts) > 1 else ""
+        if command == "START":
+            try:
+                size = int(arg)
+            except ValueError:
+                size = 0
+            if size < 5:
+                self.send("ERROR unsupported size")
+                return True
+            self.board = Position(size, self.searcher.radius)
+            self.send("OK")
+        elif command == "RECTSTART":
+            self.send("ERROR rectangular boards are not supported")
+        elif command == "ABOUT":
+            self.send(ABOUT)
+        elif command == "END":
+            return False
+        elif command == "INFO":
+            key, _, value = arg.partition(" ")
+            self.info(key.lower(), value.strip())
+        elif self.board is None:
+            self.send("ERROR START first")
+        elif command == "RESTART":
+            self.board = Position(self.board.size, self.board.radius)
+            self.send("OK")
+        elif command == "BEGIN":
+            self.me = BLACK
+            self.think()
+        elif command == "TURN":
+            move = self.parse(arg)
+            if move is None or not self.board.is_empty(*move):
+                self.send("ERROR invalid move")
+                return True
+            if not self.board.moves:
+                self.me = WHITE  # 对方先走
+            self.board.place(move[0], move[1], BLACK if self.me == WHITE else WHITE)
+            self.think()
+        elif command == "BOARD":
+            if self.load(lines):
+                self.think()
+            else:
+                self.send("ERROR invalid board")
+        elif command == "TAKEBACK":
+            move = self.parse(arg)
+            moves = [m for m in self.board.moves if m[:2] != move]
+            if move is None or len(moves) == len(self.board.moves):
+                self.send("ERROR invalid move")
+                return True
+            if self.board.moves[-1][:2] == move:
+                self.board.undo()
+            else:
+                board = Position(self.board.size, self.board.radius)
+                for col, row, player in moves:
+                    board.place(col, row, player)
+                self.board = board
+            self.send("OK")
+        else:
+            self.send(f"UNKNOWN {command}")
+        return True
+
+    def load(self, lines):
+        # BOARD之后每行"x,y,棋子"，以DONE结束；双方子数相等时己方执黑
+        # 有格式不对、在棋盘外、重复的行时读到DONE为止，返回False，棋盘保持不变
+        stones = []
+        seen = set()
+        valid = True
+        for line in lines:
+            line = line.strip()
+            if line.upper() == "DONE":
+                break
+            if not line:
+                continue
+            move = self.parse(line)
+            fields = line.split(",")
+            field = fields[2].strip() if len(fields) >= 3 else ""
+            if field == "3":
+                continue  # 连续对局里标出的连五，不是棋子
+            if move is None or move in seen or field not in ("1", "2"):
+                valid = False
+                continue
+            seen.add(move)
+            stones.append((move[0], move[1], int(field)))
+        if not valid:
+            return False
+        own = sum(1 for s in stones if s[2] == 1)
+        self.me = BLACK if own == len(stones) - own else WHITE
+        opponent = BLACK if self.me == WHITE else WHITE
+        self.board = Position(self.board.size, self.board.radius)
+        for col, row, field in stones:
+            self.board.place(col, row, self.me if field == 1 else opponent)
+        return True
+
+    def run(self, lines=None):
+        lines = iter(lines or sys.stdin)
+        try:
+            for line in lines:
+                if line.strip() and not self.handle(line, lines):
+                    break
+        finally:
+            self.searcher.close()
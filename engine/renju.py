@@ -0,0 +1,207 @@
+# 连珠（Renju）规则：黑棋禁手为长连（六子以上）、四四、三三，白棋不受限制（长连也算胜）
+# 黑棋落下恰好成五时，即使同时形成禁手也算胜
+# 每个方向取以落子点为中心的11格（两边各5格）作为键，查表得到这个方向上：是否成五、是否长连、
+# 有几个四、能把它走成活四的空位（有这样的空位就是三）；表按需计算，同样的11格在对局中反复出现
+# 三三要递归判断：成活四的空位本身是黑棋禁手时，这个三不算。先用位棋盘筛出可能是禁手的空位，
+# 大多数空位不用逐格判断，所以可以放在AI生成候选点的时候用
+from .bitboard import BLACK, DIRECTIONS
+
+FREESTYLE = "freestyle"  # 无禁手，五子以上都算胜
+RENJU = "renju"
+RULES = (FREESTYLE, RENJU)
+
+OVERLINE = "长连"
+DOUBLE_FOUR = "四四"
+DOUBLE_THREE = "三三"
+
+REACH = 5  # 窗口两边各取几格
+BORDER = 3  # 棋盘外的格子
+MAX_DEPTH = 4  # 三三递归判断的层数，再深就认为三成立
+MEMO_SIZE = 1 << 16
+
+_shapes = {}  # 11格 -> analyse的结果
+_known = {}  # 局面哈希 -> 该局面的黑棋禁手（只用于带哈希的棋盘，搜索中同一局面反复出现）
+
+
+def run(cells, k):
+    # 经过第k格的黑子连续段 (起点, 终点)
+    lo = hi = k
+    while lo > 0 and cells[lo - 1] == BLACK:
+        lo -= 1
+    while hi < len(cells) - 1 and cells[hi + 1] == BLACK:
+        hi += 1
+    return lo, hi
+
+
+def analyse(cells):
+    # cells为11格，中心（第5格）是刚落下的黑子；返回 (成五, 长连, 四的个数, 成活四的空位相对中心的偏移)
+    c = REACH
+    lo, hi = run(cells, c)
+    if hi - lo + 1 == 5:
+        return True, False, 0, ()
+    if hi - lo + 1 > 5:
+        return False, True, 0, ()
+    cells = list(cells)  # 可能是bytes
+    # 四：再走一步就能恰好成五（包含中心）的空位；活四的两个成五点只算一个四
+    points = []
+    for e in range(c - 4, c + 5):
+        if cells[e] == 0:
+            cells[e] = BLACK
+            lo, hi = run(cells, c)
+            if hi - lo + 1 == 5:
+                points.append(e)
+            cells[e] = 0
+    if points:
+        fours = len(points)
+        if fours == 2 and points[1] - points[0] == 5:
+            fours = 1
+        return False, False, fours, ()
+    # 三：再走一步能成活四（连续四子、两端都能恰好成五）的空位
+    threes = []
+    for e in range(c - 3, c + 4):
+        if cells[e] == 0:
+            cells[e] = BLACK
+            lo, hi = run(cells, c)
+            if (
+                hi - lo + 1 == 4
+                and cells[lo - 1] == 0
+                and cells[hi + 1] == 0
+                and cells[lo - 2] != BLACK
+                and cells[hi + 2] != BLACK
+            ):
+                threes.append(e - c)
+            cells[e] = 0
+    return False, False, 0, tuple(threes)
+
+
+def shape(key):
+    ret = _shapes.get(key)
+    if ret is None:
+        if len(_shapes) >= MEMO_SIZE:
+            _shapes.clear()
+        ret = _shapes[key] = analyse(key)
+    return ret
+
+
+def windows(board, col, row):
+    # 四个方向以(col, row)为中心的11格，中心按黑子算，各编成bytes作为查表的键
+    index = col * board.stride + row
+    grid = getattr(board, "grid", None)
+    ret = []
+    if grid is not None:
+        # 带缓存的棋盘有按位序存放的grid，整条线一次切出来
+        for part, shift in zip(board.masks.slices, board.masks.shifts):
+            part = part[index]
+            line = grid[part]
+            k = (index - part.start) // shift
+            cells = line[max(k - REACH, 0) : k + REACH + 1]
+            cells = (
+                [BORDER] * (REACH - k)
+                + cells
+                + [BORDER] * (k + REACH + 1 - len(line))
+            )
+            cells[REACH] = BLACK
+            ret.append(bytes(cells))
+        return ret
+    black, white = board.black, board.white
+    size, stride = board.size, board.stride
+    for dx, dy in DIRECTIONS:
+        cells = []
+        for k in range(-REACH, REACH + 1):
+            x, y = col + k * dx, row + k * dy
+            if k == 0:
+                cells.append(BLACK)
+            elif 0 <= x < size and 0 <= y < size:
+                bit = 1 << (x * stride + y)
+                cells.append(BLACK if black & bit else 2 if white & bit else 0)
+            else:
+                cells.append(BORDER)
+        ret.append(bytes(cells))
+    return ret
+
+
+def forbidden(board, col, row, depth=0):
+    # 黑棋落在空位(col, row)是否禁手，返回禁手种类或None
+    shapes = [shape(key) for key in windows(board, col, row)]
+    if any(s[0] for s in shapes):
+        return None
+    if any(s[1] for s in shapes):
+        return OVERLINE
+    if sum(s[2] for s in shapes) >= 2:
+        return DOUBLE_FOUR
+    if sum(1 for s in shapes if s[3]) < 2:
+        return None
+    if depth >= MAX_DEPTH:
+        return DOUBLE_THREE
+    # 至少两个方向的三真能走成活四才是三三
+    threes = 0
+    board.set(col, row, BLACK)
+    grid = getattr(board, "grid", None)
+    if grid is not None:
+        grid[col * board.stride + row] = BLACK
+    try:
+        for (dx, dy), s in zip(DIRECTIONS, shapes):
+            if any(
+                forbidden(board, col + k * dx, row + k * dy, depth + 1) is None
+                for k in s[3]
+            ):
+                threes += 1
+    finally:
+        board.clear(col, row)
+        if grid is not None:
+            grid[col * board.stride + row] = 0
+    return DOUBLE_THREE if threes >= 2 else None
+
+
+def suspects(board):
+    # 可能是黑棋禁手的空位：某个方向两边4格内至少3个黑子，或至少两个方向各有2个黑子
+    # 移位可能串到相邻的列，只会多选，不会漏
+    black = board.black
+    two = any_two = three = 0
+    for shift in board.masks.shifts:
+        at_least = [0, 0, 0]
+        for k in range(1, 5):
+            for x in (black << (k * shift), black >> (k * shift)):
+                at_least[2] |= at_least[1] & x
+                at_least[1] |= at_least[0] & x
+                at_least[0] |= x
+        three |= at_least[2]
+        two |= any_two & at_least[1]
+        any_two |= at_least[1]
+    return (two | three) & board.empties()
+
+
+def forbidden_cells(board, mask):
+    # mask里黑棋禁手的格子组成的掩码
+    key = getattr(board, "hash", None)
+    known = _known.get(key)
+    if known is not None and known[0] == board.occupied:
+        checked, ret = known[1], known[2]
+    else:
+        checked = ret = 0
+    todo = mask & suspects(board) & ~checked
+    for col, row in board.cells(todo):
+        if forbidden(board, col, row):
+            ret |= 1 << (col * board.stride + row)
+    if key is not None and todo:
+        if len(_known) >= MEMO_SIZE:
+            _known.clear()
+        _known[key] = (board.occupied, checked | todo, ret)
+    return ret & mask
+
+
+def exclude(board, moves):
+    # 从候选点 [(总分, 进攻分, 防守分, (col, row))] 里去掉黑棋的禁手
+    stride = board.stride
+    mask = 0
+    for m in moves:
+        mask |= 1 << (m[3][0] * stride + m[3][1])
+    bad = forbidden_cells(board, mask)
+    if not bad:
+        return moves
+    return [m for m in moves if not bad >> (m[3][0] * stride + m[3][1]) & 1]
+
+
+def legal(board, mask):
+    # 从掩码里去掉黑棋的禁手
+    return mask & ~forbidden_cells(board, mask)
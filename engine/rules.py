@@ -0,0 +1,50 @@
+# 五子棋规则核心：增量判胜、和棋计数
+from .bitboard import SIZE, DIRECTIONS, BitBoard
+
+
+class Board(BitBoard):
+    def __init__(self, size=SIZE) -> None:
+        super().__init__(size)
+        self.empty = size * size  # 剩余空位数，为0即和棋
+        self.moves = []
+        self.winner = None
+        self.runs = (0, 0, 0, 0)  # 最后一步在四个方向上的连子数
+
+    def reset(self):
+        self.__init__(self.size)
+
+    def place(self, col, row, player):
+        # 落子，只检查经过这一步的四条线，返回赢家或None
+        self.set(col, row, player)
+        self.empty -= 1
+        self.moves.append((col, row, player))
+        self.runs = tuple(
+            self.run_length(col, row, dx, dy, player) for dx, dy in DIRECTIONS
+        )
+        if max(self.runs) >= 5:
+            self.winner = player
+        return self.winner
+
+    def undo(self):
+        # 悔棋，返回撤销的那一步
+        col, row, player = self.moves.pop()
+        self.clear(col, row)
+        self.empty += 1
+        self.winner = None
+        if self.moves:
+            last_col, last_row, last_player = self.moves[-1]
+            self.runs = tuple(
+                self.run_length(last_col, last_row, dx, dy, last_player)
+                for dx, dy in DIRECTIONS
+            )
+        else:
+            self.runs = (0, 0, 0, 0)
+        return col, row, player
+
+    @property
+    def is_draw(self):
+        return self.winner is None and self.empty == 0
+
+    @property
+    def over(self):
+        return self.winner is not None or self.empty == 0
@@ -0,0 +1,338 @@
+# 博弈树搜索：负极大值 + alpha-beta剪枝 + 迭代加深，按时间或节点数限制每步的思考量
+import time
+from .bitboard import BLACK, WHITE
+from .position import Position
+from . import batch, renju
+from .threat import Solver
+from .transposition import EXACT, LOWER, UPPER, NO_MOVE, TranspositionTable
+from .evaluate import FIVE_SCORE, THREAT_SCORE
+
+SOLVER_SHARE = 0.3  # 威胁空间搜索最多占每步思考时间的比例
+WIN = 1000000  # 必胜分，减去步数以便优先选更快的胜利
+FIVE = FIVE_SCORE  # 连五的落子得分，其余的点都低于它（见evaluate.bound）
+THREAT = THREAT_SCORE  # 活四、双冲四、冲四活三、双活三的落子得分
+
+
+def threat(move):
+    # 候选点的威胁等级，越小越先搜索：0己方成五，1堵对方成五，2己方成杀，3堵对方成杀，4其它
+    _, attack, defense, _ = move
+    if attack >= FIVE:
+        return 0
+    if defense >= FIVE:
+        return 1
+    if attack >= THREAT:
+        return 2
+    if defense >= THREAT:
+        return 3
+    return 4
+
+
+def order(moves):
+    # 威胁着法在前，其余保持按缓存得分从高到低；对方已成四时只留堵点
+    moves = sorted(moves, key=threat)
+    if moves and threat(moves[0]) == 1:
+        moves = [m for m in moves if threat(m) == 1]
+    return moves
+
+
+class Timeout(Exception):
+    pass
+
+
+class Searcher:
+    def __init__(
+        self,
+        time_limit=0.2,
+        node_limit=None,
+        max_depth=10,
+        width=10,
+        tt_mb=16,
+        backend="python",
+        radius=1,
+        solver=True,
+        book=None,
+        rule=renju.FREESTYLE,
+    ) -> None:
+        self.time_limit = time_limit  # 每步的思考时间（秒），None为不限
+        self.node_limit = node_limit  # 每步的节点数上限，None为不限
+        self.max_depth = max_depth
+        self.width = width  # 每个节点只展开得分最高的width个候选点
+        self.nodes = 0
+        self.depth = 0  # 最近一次搜索完整搜完的深度
+        self.value = 0
+        self.deadline = None
+        self.stopped = False  # 由其它线程置为True时，搜索尽快结束并返回目前最好的一步
+        self.halt = None  # 工作进程里与主进程共享的停止标志，主进程被打断时置1
+        self.tt = TranspositionTable(tt_mb)  # 跨步保留，长时间对局内存也不会增长
+        self.backend = backend  # 候选点评估方式："python"逐点查缓存，"numpy"批量计算
+        self.radius = radius  # 候选点范围：与已有棋子距离不超过1或2
+        # 一般搜索之前先找双方的连续冲四/活三必胜，有自己的节点和时间限额
+        self.solver = Solver(rule=rule) if solver is True else solver or None
+        self.book = book  # 开局库（engine.book.Book），命中时不再搜索
+        self.rule = rule  # renju.RENJU时黑棋不走禁手
+
+    def close(self):
+        pass
+
+    def candidates(self, board, player):
+        # 候选点按 进攻分 + 防守分 从高到低排序，同分保持位序
+        if self.backend == "numpy" and batch.available:
+            moves = batch.candidates(board, player, board.radius)
+        else:
+            moves = board.candidates(player)
+        if self.rule == renju.RENJU and player == BLACK:
+            moves = renju.exclude(board, moves)
+        return moves
+
+    def forbidden(self, board, player, move):
+        return (
+            self.rule == renju.RENJU
+            and player == BLACK
+            and renju.forbidden(board, *move) is not None
+        )
+
+    def check(self):
+        self.nodes += 1
+        if self.stopped:
+            raise Timeout
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise Timeout
+        if self.nodes & 15 == 0 and (
+            (self.deadline is not None and time.perf_counter() >= self.deadline)
+            or (self.halt is not None and self.halt.value)
+        ):
+            raise Timeout
+
+    def key(self, board, player):
+        return board.hash ^ board.zobrist.side if player == BLACK else board.hash
+
+    @staticmethod
+    def to_tt(value, ply):
+        # 胜负分与步数有关，存表时换算成相对当前节点的值
+        if value >= WIN - 100:
+            return value + ply
+        if value <= -WIN + 100:
+            return value - ply
+        return value
+
+    @staticmethod
+    def from_tt(value, ply):
+        if value >= WIN - 100:
+            return value - ply
+        if value <= -WIN + 100:
+            return value + ply
+        return value
+
+    def evaluate(self, moves):
+        # 静态评估：己方最好的进攻点减去对方最好的进攻点
+        if not moves:
+            return 0
+        attack = max(m[1] for m in moves)
+        if attack >= FIVE:
+            return WIN
+        return attack - max(m[2] for m in moves)
+
+    def negamax(self, board, player, depth, alpha, beta, ply):
+        self.check()
+        key = self.key(board, player)
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_value, bound, move = entry
+            if move != NO_MOVE:
+                tt_move = board.position(move)
+            if tt_depth >= depth:
+                value = self.from_tt(tt_value, ply)
+                if (
+                    bound == EXACT
+                    or (bound == LOWER and value >= beta)
+                    or (bound == UPPER and value <= alpha)
+                ):
+                    return value
+
+        moves = order(self.candidates(board, player))
+        if not moves:
+            return 0
+        if depth == 0 or moves[0][1] >= FIVE:
+            value = self.evaluate(moves)
+            value = WIN - ply if value >= WIN else value
+            self.tt.store(key, depth, self.to_tt(value, ply), EXACT)
+            return value
+
+        moves = [m[3] for m in moves[: self.width]]
+        if tt_move is not None and board.is_empty(*tt_move):
+            # 置换表里记录的最佳着法最先搜索
+            if tt_move in moves:
+                moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        opponent = BLACK if player == WHITE else WHITE
+        alpha_orig = alpha
+        best = -WIN
+        best_move = moves[0]
+        for col, row in moves:
+            try:
+                if board.make(col, row, player):
+                    value = WIN - ply
+                else:
+                    value = -self.negamax(
+                        board, opponent, depth - 1, -beta, -alpha, ply + 1
+                    )
+            finally:
+                board.unmake()
+            if value > best:
+                best = value
+                best_move = (col, row)
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best <= alpha_orig:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(
+            key, depth, self.to_tt(best, ply), bound, board.index(*best_move)
+        )
+        return best
+
+    def forced(self, board, player, opponent, root):
+        # 己方有VCF/VCT时直接返回第一步；对方有VCF时只保留能化解的着法，返回新的root
+        # 威胁空间搜索的时间从本步的截止时间里扣，不另外计时
+        deadline = None
+        if self.time_limit is not None:
+            deadline = time.perf_counter() + self.time_limit * SOLVER_SHARE
+            deadline = min(deadline, self.deadline)
+        move = self.solver.vcf(board, player, deadline)
+        if move is not None:
+            return move
+        threat = self.solver.vcf(board, opponent, deadline)
+        if threat is not None:
+            safe = []
+            first = [] if self.forbidden(board, player, threat) else [threat]
+            for col, row in first + [m for m in root if m != threat]:
+                board.make(col, row, player)
+                try:
+                    if self.solver.vcf(board, opponent, deadline) is None:
+                        safe.append((col, row))
+                finally:
+                    board.unmake()
+            # 怎么走都化解不了时，照常搜索
+            return safe or root
+        move = self.solver.vct(board, player, deadline)
+        if move is not None:
+            return move
+        return root
+
+    def search(self, board, player):
+        # 返回player的落子位置，思考时间用完时返回已搜完部分中最好的一步
+        board, move, root = self.prepare(board, player)
+        if root is None:
+            return move
+        return self.deepen(board, player, root, move)
+
+    def prepare(self, board, player):
+        # 搜索前的准备：返回 (局面副本, 着法, 根节点候选)，不必搜索时根节点候选为None，
+        # 否则着法为一步也没搜完时的退路
+        self.nodes = 0
+        self.depth = 0
+        self.value = 0
+        start = time.perf_counter()
+        self.deadline = None if self.time_limit is None else start + self.time_limit
+        # 在副本上搜索，不影响调用方的棋盘
+        if isinstance(board, Position) and board.radius == self.radius:
+            board = board.copy()
+        else:
+            board = Position.from_board(board, self.radius)
+        self.tt.new_search()
+
+        if self.book is not None:
+            move = self.book.move(board, player)
+            if move is not None and not self.forbidden(board, player, move):
+                return board, move, None
+
+        moves = self.candidates(board, player)
+        if not moves:
+            center = board.size // 2
+            if board.is_empty(center, center):
+                return board, (center, center), None
+            return board, next(board.cells(board.empties()), (-1, -1)), None
+
+        # 一步也没搜完时，退回到一层的评分结果
+        best = moves[0][3]
+        moves = order(moves)
+        if moves[0][1] >= FIVE:
+            self.value = WIN
+            return board, moves[0][3], None
+        root = [m[3] for m in moves[: self.width]]
+        if best not in root:
+            best = root[0]
+
+        if self.solver is not None:
+            opponent = BLACK if player == WHITE else WHITE
+            forced = self.forced(board, player, opponent, root)
+            if isinstance(forced, tuple):
+                # 连续冲四/活三必胜，步数不确定，按搜索能证明的最长胜利计分
+                self.value = WIN - self.max_depth
+                return board, forced, None
+            root = forced
+            if best not in root:
+                best = root[0]
+        return board, best, root
+
+    def shared(self, depth, alpha):
+        # 根节点的alpha下界，多进程搜索时与其它进程共享
+        return alpha
+
+    def publish(self, depth, alpha):
+        pass
+
+    def deepen(self, board, player, root, best):
+        # 对根节点候选迭代加深，返回最好的一步
+        opponent = BLACK if player == WHITE else WHITE
+        root = root[:]
+        for depth in range(1, self.max_depth + 1):
+            alpha = -WIN - 1
+            iteration_best = None
+            try:
+                for col, row in root:
+                    alpha = self.shared(depth, alpha)
+                    try:
+                        if board.make(col, row, player):
+                            value = WIN
+                        else:
+                            value = -self.negamax(
+                                board, opponent, depth - 1, -WIN - 1, -alpha, 1
+                            )
+                    finally:
+                        board.unmake()
+                    if value > alpha:
+                        alpha = value
+                        iteration_best = (col, row)
+                        self.publish(depth, alpha)
+            except Timeout:
+                # 上一轮的最佳着法总是最先搜索，这一轮已搜过的部分仍然可用
+                if iteration_best is not None:
+                    best = iteration_best
+                break
+
+            self.depth = depth
+            self.value = alpha
+            if iteration_best is not None:
+                # 其它进程已有更好的着法时，本进程这一轮没有最佳着法
+                best = iteration_best
+                # 下一轮先搜索本轮最佳着法
+                root.remove(best)
+                root.insert(0, best)
+            self.done(depth, iteration_best, alpha)
+            if abs(alpha) >= WIN - self.max_depth:
+                break
+
+        return best
+
+    def done(self, depth, move, value):
+        # 搜完一整轮时调用，move为None表示这一轮没有超过共享下界的着法
+        pass
@@ -0,0 +1,120 @@
+# 后台思考：AI在单独的线程里搜索，界面主循环每帧用poll()取结果，思考时窗口不会卡住
+# 轮到对方时继续思考（后台预想）：对对方最可能的几种应手先算好自己的回应，对方真的这样走就立即落子
+import threading
+from .bitboard import BLACK, WHITE
+from .search import order
+
+
+class Thinker:
+    def __init__(self, searcher, ponder=True, ponder_moves=3, notify=None) -> None:
+        self.searcher = searcher
+        self.ponder_moves = ponder_moves if ponder else 0  # 后台预想对方的几种应手
+        self.notify = notify  # 着法算好时在思考线程里调用，界面用它唤醒主循环
+        self.condition = threading.Condition()
+        self.job = None  # ("think"或"ponder", 局面副本, 轮到谁走)
+        self.generation = 0  # 每次新的请求或取消加一，旧请求的结果作废
+        self.result = None  # (generation, 着法)
+        self.pondered = {}  # (局面哈希, 轮到谁走) -> 算好的着法
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, kind, board, player):
+        with self.condition:
+            self.generation += 1
+            self.result = None
+            self.job = (kind, board.copy(), player)
+            self.searcher.stopped = True  # 打断正在进行的搜索
+            self.condition.notify()
+
+    def think(self, board, player):
+        # 请求player在board上的着法，之后每帧调用poll()
+        move = self.pondered.get((board.hash, player))
+        if move is not None and board.is_empty(*move):
+            # 后台预想命中，不必再搜索
+            with self.condition:
+                self.generation += 1
+                self.job = None
+                self.searcher.stopped = True
+                self.result = (self.generation, move)
+            return
+        self.submit("think", board, player)
+
+    def ponder(self, board, player):
+        # 轮到player（对方）走时，预先算好对其最可能的几种应手的回应
+        if self.ponder_moves:
+            self.submit("ponder", board, player)
+
+    def poll(self):
+        # 结果已算好时返回着法并清除，否则返回None
+        with self.condition:
+            if self.result is not None and self.result[0] == self.generation:
+                move = self.result[1]
+                self.result = None
+                return move
+        return None
+
+    def use(self, searcher):
+        # 换用另一个搜索器（如换引擎），丢弃正在进行的思考和预想结果
+        self.cancel()
+        with self.condition:
+            self.searcher = searcher
+            self.pondered = {}
+
+    def cancel(self):
+        # 重新开始、悔棋时调用，丢弃正在进行的思考
+        with self.condition:
+            self.generation += 1
+            self.job = None
+            self.result = None
+            self.searcher.stopped = True
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.job = None
+            self.searcher.stopped = True
+            self.condition.notify()
+        self.thread.join()
+        self.searcher.close()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.job is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                kind, board, player = self.job
+                self.job = None
+                generation = self.generation
+                self.searcher.stopped = False
+            if kind == "think":
+                move = self.searcher.search(board, player)
+                with self.condition:
+                    if generation != self.generation:
+                        continue
+                    self.result = (generation, move)
+                if self.notify is not None:
+                    self.notify()
+            else:
+                self.run_ponder(board, player, generation)
+
+    def run_ponder(self, board, player, generation):
+        self.pondered = {}
+        opponent = BLACK if player == WHITE else WHITE
+        moves = order(self.searcher.candidates(board, player))
+        for _, _, _, (col, row) in moves[: self.ponder_moves]:
+            if board.make(col, row, player):
+                board.unmake()
+                continue
+            try:
+                move = self.searcher.search(board, opponent)
+                key = (board.hash, opponent)
+            finally:
+                board.unmake()
+            with self.condition:
+                # 被打断的搜索没有用满思考时间，结果不保存
+                if generation != self.generation or self.searcher.stopped:
+                    return
+                self.pondered[key] = move
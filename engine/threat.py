@@ -0,0 +1,217 @@
+# 威胁空间搜索：连续冲四取胜（VCF）和连续冲四、活三取胜（VCT）
+# 只走带威胁的着法，对方只有少数几种应法，比全宽度搜索便宜得多
+# 成五、成四用位棋盘的五格窗口精确计算（BitBoard.threat_cells），活三用patterns里的棋型标志
+import time
+from .bitboard import BLACK, WHITE
+from .evaluate import LIVE_THREE
+from . import renju
+
+MAX_CACHE = 1 << 16
+
+
+class Exhausted(Exception):
+    pass
+
+
+def bits(mask):
+    return bin(mask).count("1")
+
+
+class Solver:
+    def __init__(
+        self,
+        node_limit=20000,
+        time_limit=0.05,
+        vcf_depth=12,
+        vct_depth=4,
+        rule=renju.FREESTYLE,
+    ) -> None:
+        self.node_limit = node_limit  # 每次求解的节点数上限
+        self.time_limit = time_limit  # 每次求解的时间上限（秒）
+        self.vcf_depth = vcf_depth  # 最多连续冲四的次数
+        self.vct_depth = vct_depth  # 最多连续活三的次数（其间的冲四另算）
+        self.rule = rule  # renju.RENJU时黑棋的禁手不能走，也不算威胁
+        # 已证明的结果，(哈希, 进攻方, 种类) -> (深度, 着法位序或None)
+        # 有着法的是必胜，None表示在该深度内没有找到
+        self.cache = {}
+        self.nodes = 0
+        self.deadline = None
+
+    def check(self):
+        self.nodes += 1
+        if self.nodes >= self.node_limit:
+            raise Exhausted
+        if self.nodes & 15 == 0 and time.perf_counter() >= self.deadline:
+            raise Exhausted
+
+    def remember(self, key, depth, move):
+        if len(self.cache) >= MAX_CACHE:
+            self.cache.clear()
+        self.cache[key] = (depth, move)
+
+    def run(self, method, board, attacker, deadline=None):
+        # 在限额内求解，返回必胜的第一步或None；限额用完也返回None
+        # deadline为调用方的截止时间，与自己的时间上限取较早的一个
+        self.nodes = 0
+        now = time.perf_counter()
+        self.deadline = now + self.time_limit
+        if deadline is not None:
+            if now >= deadline:
+                return None  # 调用方的时间已经用完，不再开始新的求解
+            self.deadline = min(self.deadline, deadline)
+        try:
+            move = method(board, attacker)
+        except Exhausted:
+            return None
+        return None if move is None else board.position(move)
+
+    def vcf(self, board, attacker, deadline=None):
+        return self.run(
+            lambda b, a: self.search_vcf(b, a, self.vcf_depth),
+            board,
+            attacker,
+            deadline,
+        )
+
+    def vct(self, board, attacker, deadline=None):
+        return self.run(
+            lambda b, a: self.search_vct(b, a, self.vct_depth),
+            board,
+            attacker,
+            deadline,
+        )
+
+    def allowed(self, board, player, mask):
+        # 去掉mask里player不能走的格子（连珠规则下黑棋的禁手）
+        if self.rule == renju.RENJU and player == BLACK and mask:
+            return renju.legal(board, mask)
+        return mask
+
+    def fives(self, board, player):
+        return self.allowed(board, player, board.threat_cells(player, 4))
+
+    def forced(self, board, attacker):
+        # 轮到attacker走：(立即成五的格子, 需要先堵的对方成五格子)
+        defender = BLACK if attacker == WHITE else WHITE
+        return self.fives(board, attacker), self.fives(board, defender)
+
+    def lookup(self, key, depth):
+        entry = self.cache.get(key)
+        if entry is not None and (entry[1] is not None or entry[0] >= depth):
+            return True, entry[1]
+        return False, None
+
+    def search_vcf(self, board, attacker, depth):
+        fives, blocks = self.forced(board, attacker)
+        if fives:
+            return (fives & -fives).bit_length() - 1
+        if depth == 0 or bits(blocks) > 1:
+            return None
+        key = (board.hash, attacker, 0)
+        found, move = self.lookup(key, depth)
+        if found:
+            return move
+
+        fours = self.allowed(board, attacker, board.threat_cells(attacker, 3))
+        if blocks:
+            # 对方已成四，只能在堵点上冲四
+            fours &= blocks
+        defender = BLACK if attacker == WHITE else WHITE
+        result = None
+        for col, row in board.cells(fours):
+            self.check()
+            if self.four(board, attacker, defender, col, row, depth, self.search_vcf):
+                result = board.index(col, row)
+                break
+        self.remember(key, depth, result)
+        return result
+
+    def four(self, board, attacker, defender, col, row, depth, then):
+        # attacker在(col, row)冲四，defender只能堵，之后由then继续；返回是否必胜
+        board.make(col, row, attacker)
+        try:
+            fives = self.fives(board, attacker)
+            if self.fives(board, defender):
+                return False  # 对方先成五
+            if not fives:
+                return False
+            if bits(fives) >= 2:
+                return True  # 活四或双冲四，堵不住
+            block_col, block_row = board.position(fives.bit_length() - 1)
+            if not self.allowed(board, defender, fives):
+                return True  # 堵点是黑棋的禁手
+            board.make(block_col, block_row, defender)
+            try:
+                return then(board, attacker, depth - 1) is not None
+            finally:
+                board.unmake()
+        finally:
+            board.unmake()
+
+    def threes(self, board, attacker):
+        # 落下后在某个方向形成活三的候选点
+        cache = board.cache[attacker]
+        ret = 0
+        for col, row in board.cells(board.frontier):
+            i = col * board.stride + row
+            if (cache[0][i] | cache[1][i] | cache[2][i] | cache[3][i]) & LIVE_THREE:
+                ret |= 1 << i
+        return self.allowed(board, attacker, ret)
+
+    def search_vct(self, board, attacker, depth):
+        move = self.search_vcf(board, attacker, self.vcf_depth)
+        if move is not None:
+            return move
+        fives, blocks = self.forced(board, attacker)
+        if depth == 0 or blocks:
+            return None
+        key = (board.hash, attacker, 1)
+        found, move = self.lookup(key, depth)
+        if found:
+            return move
+
+        defender = BLACK if attacker == WHITE else WHITE
+        fours = self.allowed(board, attacker, board.threat_cells(attacker, 3))
+        result = None
+        # 先冲四（对方应法唯一），再走活三
+        for col, row in board.cells(fours):
+            self.check()
+            if self.four(board, attacker, defender, col, row, depth, self.search_vct):
+                result = board.index(col, row)
+                break
+        if result is None:
+            for col, row in board.cells(self.threes(board, attacker) & ~fours):
+                self.check()
+                if self.three(board, attacker, defender, col, row, depth):
+                    result = board.index(col, row)
+                    break
+        self.remember(key, depth, result)
+        return result
+
+    def three(self, board, attacker, defender, col, row, depth):
+        # attacker在(col, row)走活三，defender的每一种应法之后attacker都还能VCT才算必胜
+        board.make(col, row, attacker)
+        try:
+            if self.fives(board, defender):
+                return False
+            # 对方不应时能VCF，才是真正的威胁
+            if self.search_vcf(board, attacker, self.vcf_depth) is None:
+                return False
+            # 应法：进攻方下一步成四、成五要用到的空位，以及防守方自己的冲四
+            replies = (
+                board.threat_cells(attacker, 3)
+                | board.threat_cells(attacker, 4)
+                | board.threat_cells(defender, 3)
+            )
+            replies = self.allowed(board, defender, replies)
+            for reply_col, reply_row in board.cells(replies):
+                self.check()
+                board.make(reply_col, reply_row, defender)
+                try:
+                    if self.search_vct(board, attacker, depth - 1) is None:
+                        return False
+                finally:
+                    board.unmake()
+            return True
+        finally:
+            board.unmake()
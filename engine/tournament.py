@@ -0,0 +1,200 @@
+# 自对弈/对抗赛：两个引擎轮流执黑，多局并行，统计胜负和、Elo差（95%置信区间）、每步用时和每秒节点数
+# 每局结果写成一行JSON，格式与开局库的对局记录相同（steps、winner），可以直接用来生成开局库
+#   python -m engine.tournament alphabeta mcts --games 20 --jobs 4 --results results.jsonl
+# 引擎写成"名字,参数=值,..."，如"alphabeta,time_limit=0.5,width=8"；两个引擎相同时为自对弈，按执黑一方统计
+import json
+import math
+import os
+import random
+import time
+from .bitboard import SIZE, BLACK, WHITE
+from .position import Position
+from . import ai, book
+
+_engines = {}
+
+
+def parse(spec):
+    # "alphabeta,time_limit=0.5" -> ("alphabeta", {"time_limit": 0.5})
+    name, *pairs = spec.split(",")
+    options = {}
+    for pair in pairs:
+        key, value = pair.split("=", 1)
+        for kind in (int, float):
+            try:
+                value = kind(value)
+                break
+            except ValueError:
+                pass
+        options[key] = value
+    return name, options
+
+
+def engine(spec):
+    # 每个进程里同样的引擎只建一次，置换表、开局库等在各局之间保留
+    if spec not in _engines:
+        name, options = parse(spec)
+        options.setdefault("workers", 1)
+        if isinstance(options.get("book"), str):
+            options["book"] = book.load(options["book"])
+        _engines[spec] = ai.create(name, **options)
+    return _engines[spec]
+
+
+def random_opening(plies, size, rng):
+    # 从天元开始，在已有棋子周围随机落子
+    board = Position(size)
+    steps = []
+    player = BLACK
+    for i in range(plies):
+        if i == 0:
+            col = row = size // 2
+        else:
+            col, row = rng.choice(sorted(board.cells(board.frontier)))
+        board.place(col, row, player)
+        steps.append((col, row, player))
+        player = BLACK if player == WHITE else WHITE
+    return steps
+
+
+def play(black, white, opening, size=SIZE, max_moves=None):
+    # 下一局，返回一行结果；black、white为引擎描述
+    board = Position(size)
+    for col, row, player in opening:
+        board.place(col, row, player)
+    engines = {BLACK: engine(black), WHITE: engine(white)}
+    stats = {BLACK: [0, 0.0, 0], WHITE: [0, 0.0, 0]}  # 步数、用时、节点数
+    player = BLACK if len(board.moves) % 2 == 0 else WHITE
+    max_moves = max_moves or size * size
+    while not board.over and len(board.moves) < max_moves:
+        searcher = engines[player]
+        start = time.perf_counter()
+        col, row = searcher.search(board, player)
+        stats[player][0] += 1
+        stats[player][1] += time.perf_counter() - start
+        stats[player][2] += searcher.nodes
+        board.place(col, row, player)
+        player = BLACK if player == WHITE else WHITE
+    return {
+        "black": black,
+        "white": white,
+        "opening": len(opening),
+        "winner": board.winner,
+        "steps": [list(step) for step in board.moves],
+        "stats": {"black": stats[BLACK], "white": stats[WHITE]},
+    }
+
+
+def elo(wins, draws, losses):
+    # 返回 (Elo差, 95%置信区间的半宽)；全胜或全负时Elo差为无穷，无法估计的半宽为无穷
+    n = wins + draws + losses
+    if not n:
+        return 0.0, math.inf
+    score = (wins + draws / 2) / n
+    variance = (
+        wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score**2
+    ) / n
+    margin = 1.96 * math.sqrt(variance / n)
+
+    def to_elo(s):
+        if s <= 0:
+            return -math.inf
+        if s >= 1:
+            return math.inf
+        return 400 * math.log10(s / (1 - s))
+
+    if score <= 0 or score >= 1 or variance == 0:
+        # 全胜、全负或全和时样本没有方差，区间无从估计
+        return to_elo(score), math.inf
+    high = to_elo(min(score + margin, 1))
+    low = to_elo(max(score - margin, 0))
+    return to_elo(score), (high - low) / 2
+
+
+def summary(results, a, b):
+    # 从a的角度统计
+    wins = draws = losses = 0
+    moves = {a: 0, b: 0}
+    seconds = {a: 0.0, b: 0.0}
+    nodes = {a: 0, b: 0}
+    for r in results:
+        colour = BLACK if r["black"] == a else WHITE
+        if r["winner"] is None:
+            draws += 1
+        elif r["winner"] == colour:
+            wins += 1
+        else:
+            losses += 1
+        for side in ("black", "white"):
+            count, used, searched = r["stats"][side]
+            moves[r[side]] += count
+            seconds[r[side]] += used
+            nodes[r[side]] += searched
+    diff, margin = elo(wins, draws, losses)
+    lines = [f"{a} 对 {b}：胜{wins} 和{draws} 负{losses}，Elo差 {diff:+.0f} ± {margin:.0f}"]
+    for name in (a, b):
+        per_move = seconds[name] / moves[name] if moves[name] else 0
+        nps = nodes[name] / seconds[name] if seconds[name] else 0
+        lines.append(f"  {name}：每步 {per_move * 1000:.0f} 毫秒，每秒 {nps:.0f} 个节点")
+    return "\n".join(lines)
+
+
+def openings(count, plies, size, seed, path=None):
+    # 每个开局下两局，双方轮流执黑；有开局文件时按顺序取用（每行一局，取前plies步）
+    rng = random.Random(seed)
+    ret = []
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    game = json.loads(line)
+                    steps = game["steps"] if isinstance(game, dict) else game
+                    ret.append([tuple(step) for step in steps[:plies]])
+    while len(ret) < count:
+        ret.append(random_opening(plies, size, rng))
+    return ret[:count]
+
+
+if __name__ == "__main__":
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+
+    parser = argparse.ArgumentParser(description="引擎对抗赛")
+    parser.add_argument("a", help="引擎A，如alphabeta,time_limit=0.2")
+    parser.add_argument("b", help="引擎B")
+    parser.add_argument("--games", type=int, default=20, help="总局数（每个开局两局）")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="同时进行的局数")
+    parser.add_argument("--plies", type=int, default=2, help="开局步数")
+    parser.add_argument("--openings", help="开局文件（JSON行，与开局库的对局记录格式相同）")
+    parser.add_argument("--size", type=int, default=SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", help="每局结果写入的文件（JSON行，追加）")
+    args = parser.parse_args()
+
+    pairs = []
+    count = (args.games + 1) // 2
+    for opening in openings(count, args.plies, args.size, args.seed, args.openings):
+        pairs.append((args.a, args.b, opening))
+        pairs.append((args.b, args.a, opening))
+    pairs = pairs[: args.games]
+
+    results = []
+    out = open(args.results, "a", encoding="utf-8") if args.results else None
+    with ProcessPoolExecutor(args.jobs) as pool:
+        futures = [
+            pool.submit(play, black, white, opening, args.size)
+            for black, white, opening in pairs
+        ]
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            if out:
+                out.write(json.dumps(result, separators=(",", ":")) + "\n")
+                out.flush()
+            names = {BLACK: result["black"], WHITE: result["white"]}
+            winner = names[result["winner"]] + "胜" if result["winner"] else "和棋"
+            moves = len(result["steps"])
+            print(f"第{len(results)}局：{result['black']}执黑，{moves}步，{winner}")
+    if out:
+        out.close()
+    print(summary(results, args.a, args.b))
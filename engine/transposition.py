@@ -0,0 +1,124 @@
+# Zobrist哈希和置换表
+# 置换表大小固定（按MB配置），每个桶两格：一格按深度优先替换，一格总是替换
+import random
+from array import array
+from .bitboard import SIZE, BLACK
+
+EXACT = 0
+LOWER = 1  # 分数是下界（发生了beta截断）
+UPPER = 2  # 分数是上界（没有着法超过alpha）
+
+NO_MOVE = 0xFFFF
+MASK = (1 << 64) - 1
+ENTRY_BYTES = 16  # 每格一个64位键和一个64位打包数据
+
+_keys = {}
+
+
+class Zobrist:
+    def __init__(self, size=SIZE) -> None:
+        # 固定种子，保证不同进程、不同次运行得到同样的哈希（开局库依赖这一点）
+        rng = random.Random(20240615 + size)
+        count = size * (size + 1)
+        self.black = [rng.getrandbits(64) for _ in range(count)]
+        self.white = [rng.getrandbits(64) for _ in range(count)]
+        self.side = rng.getrandbits(64)  # 轮到黑方走时异或
+
+    def key(self, player, index):
+        return self.black[index] if player == BLACK else self.white[index]
+
+    def hash(self, board):
+        # 从头计算整个棋盘的哈希，平时应在落子时增量更新
+        h = 0
+        for col, row in board.cells(board.black):
+            h ^= self.black[board.index(col, row)]
+        for col, row in board.cells(board.white):
+            h ^= self.white[board.index(col, row)]
+        return h
+
+
+def zobrist(size=SIZE):
+    if size not in _keys:
+        _keys[size] = Zobrist(size)
+    return _keys[size]
+
+
+class TranspositionTable:
+    def __init__(self, mb=16, buffer=None) -> None:
+        # buffer为可写的共享内存（如multiprocessing.RawArray），多个进程共用一张表，
+        # 大小至少为size(mb)字节；为None时用进程自己的数组
+        self.buckets = self.size(mb) // (2 * ENTRY_BYTES)
+        self.buffer = buffer
+        self.age = 0
+        self.hits = 0
+        self.stores = 0
+        if buffer is None:
+            self.clear()
+        else:
+            # 共享内存新建时已全为0，接入时不能清空，否则会冲掉其它进程写入的条目
+            self.attach()
+
+    @staticmethod
+    def size(mb):
+        return max(1, int(mb * 1024 * 1024) // (2 * ENTRY_BYTES)) * 2 * ENTRY_BYTES
+
+    def clear(self):
+        n = 2 * self.buckets
+        if self.buffer is None:
+            self.keys = array("Q", [0]) * n
+            self.data = array("q", [0]) * n
+        else:
+            view = memoryview(self.buffer).cast("B")
+            view[: n * ENTRY_BYTES] = bytes(n * ENTRY_BYTES)
+            self.attach()
+        self.age = 0
+
+    def attach(self):
+        n = 2 * self.buckets
+        view = memoryview(self.buffer).cast("B")
+        self.keys = view[: n * 8].cast("Q")
+        self.data = view[n * 8 : n * ENTRY_BYTES].cast("q")
+
+    def new_search(self):
+        # 每次搜索换一代，旧一代的深度优先格可以被覆盖
+        self.age = (self.age + 1) & 0xFF
+
+    @staticmethod
+    def pack(depth, score, bound, move, age):
+        # 边界类型存为bound + 1，保证有效条目的数据不为0
+        return (score << 32) | (move << 16) | (age << 8) | (depth << 2) | (bound + 1)
+
+    def probe(self, key):
+        # 返回 (depth, score, bound, move) 或None
+        # 键存的是 键 ^ 数据，多个进程同时写同一格时，写了一半的条目对不上键，当作未命中
+        i = (key % self.buckets) * 2
+        for slot in (i, i + 1):
+            d = self.data[slot]
+            if self.keys[slot] ^ (d & MASK) == key:
+                if d:
+                    self.hits += 1
+                    return (d >> 2) & 0x3F, d >> 32, (d & 3) - 1, (d >> 16) & 0xFFFF
+        return None
+
+    def store(self, key, depth, score, bound, move=NO_MOVE):
+        self.stores += 1
+        i = (key % self.buckets) * 2
+        data = self.pack(min(depth, 0x3F), score, bound, move, self.age)
+        old = self.data[i]
+        old_key = self.keys[i] ^ (old & MASK)
+        # 深度优先格：同一局面、更深的结果或旧一代的条目才覆盖
+        if (
+            old_key == key
+            or not old
+            or depth >= (old >> 2) & 0x3F
+            or (old >> 8) & 0xFF != self.age
+        ):
+            if old_key != key and old:
+                # 被挤出的条目降到总是替换格
+                self.keys[i + 1] = self.keys[i]
+                self.data[i + 1] = old
+            self.keys[i] = key ^ (data & MASK)
+            self.data[i] = data
+        else:
+            self.keys[i + 1] = key ^ (data & MASK)
+            self.data[i + 1] = data
@@ -0,0 +1,187 @@
+# 权重调优（Texel方法）：从对局记录里取局面，用逻辑回归拟合evaluate.combine的各项权重，
+# 使 sigmoid(K * 静态评估) 尽量接近轮到的一方最终的得分（胜1、和0.5、负0）
+# 静态评估与Searcher.evaluate相同：己方最好的落子点得分减去对方最好的落子点得分。最好的点与权重有关，
+# 所以交替进行：按当前权重选出每个局面最好的点，再固定这些点做若干步梯度下降
+#   python -m engine.tune data/weights.json --games results.jsonl --selfplay 200
+# 对局记录与开局库、对抗赛的格式相同；结果写成{名称: 权重}的JSON，evaluate启动时自动加载data/weights.json
+import json
+import random
+from .bitboard import SIZE, BLACK, WHITE
+from .position import Position
+from .evaluate import FEATURES, FIXED, DEFAULT_WEIGHTS, features
+from . import evaluate
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TOP = 16  # 每个局面只保留当前权重下得分最高的几个点
+SKIP = 4  # 跳过开局的几步
+
+
+def extract(games, size=SIZE):
+    # 返回 (进攻特征, 防守特征, 标签)：进攻、防守为 (局面数, TOP, 特征数)，不足TOP个点的补-1
+    attacks, defenses, labels = [], [], []
+    for steps, winner in games:
+        board = Position(size)
+        for ply, (col, row, player) in enumerate(steps):
+            if ply >= SKIP:
+                sample = position(board, player)
+                if sample is not None:
+                    attacks.append(sample[0])
+                    defenses.append(sample[1])
+                    labels.append(
+                        0.5 if winner is None else 1.0 if winner == player else 0.0
+                    )
+            if board.place(col, row, player):
+                break
+    shape = (len(labels), TOP, len(FEATURES))
+    a = np.full(shape, -1, np.int16)
+    d = np.full(shape, -1, np.int16)
+    for i, (attack, defense) in enumerate(zip(attacks, defenses)):
+        a[i, : len(attack)] = attack
+        d[i, : len(defense)] = defense
+    return a, d, np.array(labels)
+
+
+def position(board, player):
+    # 轮到player时各候选点的特征；有一方能成五的局面胜负已定，不用来调参
+    opponent = BLACK if player == WHITE else WHITE
+    mine = board.cache[player]
+    theirs = board.cache[opponent]
+    attack, defense = [], []
+    for col, row in board.cells(board.frontier):
+        i = board.index(col, row)
+        attack.append(features(*(mine[d][i] for d in range(4))))
+        defense.append(features(*(theirs[d][i] for d in range(4))))
+    if not attack or any(f[0] for f in attack) or any(f[0] for f in defense):
+        return None
+    def top(rows):
+        rows.sort(key=lambda f: -sum(w * x for w, x in zip(evaluate.weights, f)))
+        return rows[:TOP]
+
+    return top(attack), top(defense)
+
+
+def best(x, w):
+    # 每个局面按权重w得分最高的点的特征，补位的点不参与
+    score = x @ w
+    score[x[:, :, 0] < 0] = -np.inf
+    return x[np.arange(len(x)), score.argmax(axis=1)].astype(np.float64)
+
+
+def loss(e, y, k):
+    p = 1 / (1 + np.exp(-np.clip(k * e, -50, 50)))
+    p = np.clip(p, 1e-9, 1 - 1e-9)
+    return float(-(y * np.log(p) + (1 - y) * np.log(1 - p)).mean())
+
+
+def fit_k(a, d, y, w):
+    # 先用当前权重找合适的尺度K（在对数刻度上搜索）
+    e = best(a, w) @ w - best(d, w) @ w
+    ks = [10**x for x in np.linspace(-7, -2, 51)]
+    return min(ks, key=lambda k: loss(e, y, k))
+
+
+def tune(a, d, y, w, k, rounds=5, steps=200, rate=0.02, prior=0.001, log=print):
+    # Adam梯度下降，步长按各项默认权重的大小缩放；连五、活四不动
+    # prior把各项往默认权重拉，局面少时不至于把权重调得面目全非
+    w = w.astype(np.float64)
+    scale = np.array([max(abs(DEFAULT_WEIGHTS[n]), 10) for n in FEATURES], float)
+    free = np.array([n not in FIXED for n in FEATURES])
+    limit = DEFAULT_WEIGHTS["live_four"] - 1
+    default = np.array([DEFAULT_WEIGHTS[n] for n in FEATURES], float)
+    m = np.zeros_like(w)
+    v = np.zeros_like(w)
+    t = 0
+    for r in range(rounds):
+        x = best(a, w) - best(d, w)
+        for _ in range(steps):
+            t += 1
+            z = np.clip(k * (x @ w), -50, 50)
+            p = 1 / (1 + np.exp(-z))
+            grad = k * (x.T @ (p - y)) / len(y) * scale
+            grad += prior * (w - default) / scale
+            m = 0.9 * m + 0.1 * grad
+            v = 0.999 * v + 0.001 * grad**2
+            step = rate * (m / (1 - 0.9**t)) / (np.sqrt(v / (1 - 0.999**t)) + 1e-12)
+            w[free] -= (step * scale)[free]
+            # 单项不超过活四；几项相加越级的由evaluate.bound在打分时截住
+            w[free] = np.clip(w[free], -limit, limit)
+        e = best(a, w) @ w - best(d, w) @ w
+        log(f"第{r + 1}轮：损失 {loss(e, y, k):.5f}")
+    return w
+
+
+def read(paths):
+    games = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                game = json.loads(line)
+                if isinstance(game, list):
+                    continue  # 没有胜负的记录不能用
+                games.append(([tuple(s) for s in game["steps"]], game.get("winner")))
+    return games
+
+
+def selfplay(count, engine, plies, jobs, seed, size=SIZE):
+    # 用对抗赛的方法自对弈，返回对局记录
+    from concurrent.futures import ProcessPoolExecutor
+    from .tournament import play, random_opening
+
+    rng = random.Random(seed)
+    openings = [random_opening(plies, size, rng) for _ in range(count)]
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = [pool.submit(play, engine, engine, o, size) for o in openings]
+        return [
+            ([tuple(s) for s in r["steps"]], r["winner"])
+            for r in (f.result() for f in futures)
+        ]
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="用对局记录调整评估权重")
+    parser.add_argument("output", help="权重文件，如data/weights.json")
+    parser.add_argument("--games", nargs="*", default=[], help="对局记录文件")
+    parser.add_argument("--selfplay", type=int, default=0, help="另外自对弈的局数")
+    parser.add_argument("--engine", default="alphabeta,time_limit=0.05")
+    parser.add_argument("--plies", type=int, default=4, help="自对弈的随机开局步数")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--save", help="自对弈的对局另存为记录文件")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--prior", type=float, default=0.001, help="向默认权重回拉的强度")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if np is None:
+        parser.error("调参需要NumPy")
+
+    games = read(args.games)
+    if args.selfplay:
+        played = selfplay(args.selfplay, args.engine, args.plies, args.jobs, args.seed)
+        if args.save:
+            with open(args.save, "a", encoding="utf-8") as f:
+                for steps, winner in played:
+                    record = {"steps": [list(s) for s in steps], "winner": winner}
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        games += played
+    a, d, y = extract(games)
+    if not len(y):
+        parser.error("没有可用的局面")
+    w = np.array(evaluate.weights, np.float64)
+    k = fit_k(a, d, y, w)
+    e = best(a, w) @ w - best(d, w) @ w
+    print(f"{len(games)}局，{len(y)}个局面，K={k:.2e}，调整前损失 {loss(e, y, k):.5f}")
+    w = tune(a, d, y, w, k, args.rounds, args.steps, prior=args.prior)
+    result = {name: int(round(x)) for name, x in zip(FEATURES, w)}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    for name, old in zip(FEATURES, evaluate.weights):
+        print(f"  {name:24} {old:>8} -> {result[name]:>8}")
@@ -1,22 +1,66 @@
+# 导入本文件没有副作用（不占端口、不开窗口、不连网络），启动在main()里的setup()中进行，
+# 所以多进程的子进程重新导入本文件也没关系
+import time
+
+IMPORT_START = time.perf_counter()
+
 import pygame
 import threading
 import socket
 import pathlib
 import os
-import copy
 import sys
 import json
-from itertools import repeat
-import tkinter as tk
-from tkinter import messagebox
+import multiprocessing
+from engine import ai, book, renju
+from engine.bitboard import SIZE
+from engine.position import Position
+from engine.thinker import Thinker
+from engine.analysis import Analyzer
+from engine.hints import Hinter
+from engine.search import WIN
+
+
+# 后台线程（AI着法、落子提示）有了新结果时发这个事件，唤醒等待中的主循环；在setup()里注册
+WAKE = None
+
+
+def wake():
+    if WAKE is not None:
+        pygame.event.post(pygame.event.Event(WAKE))
 
 
-try:
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.bind(("127.0.0.1", 5477))
-except socket.error:
-    print("程序已在运行！")
-    sys.exit(1)
+def lock():
+    # 占用本机端口，保证同一台电脑只运行一个客户端
+    global instance
+    try:
+        instance = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        instance.bind(("127.0.0.1", 5477))
+    except socket.error:
+        print("程序已在运行！")
+        sys.exit(1)
+
+
+tk_root = None  # 系统对话框用的隐藏根窗口，第一次弹对话框时才导入tkinter并创建
+
+
+def dialog(action, title, message):
+    # 在主线程里弹出系统对话框；没有tkinter或没有图形界面时改在标题栏显示
+    global tk_root
+    try:
+        import tkinter
+        from tkinter import messagebox
+
+        if tk_root is None:
+            tk_root = tkinter.Tk()
+            tk_root.withdraw()
+    except Exception:
+        pygame.display.set_caption(f"五子棋 - {title}：{message}")
+        return
+    if action == "show_info":
+        messagebox.showinfo(title, message)
+    else:
+        messagebox.showwarning(title, message)
 
 
 def info(title, message):
@@ -49,15 +93,23 @@ class ConnectionServer:
         self.opponent_id = None
         self.is_connected = False
         self.is_matched = False
+        self.connecting = True  # 在后台连接服务器，不耽误窗口出现
         self.tcp_client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        threading.Thread(target=self.connect, args=(host, port), daemon=True).start()
+
+    def connect(self, host, port):
         try:
             self.tcp_client.connect((host, port))
-            self.is_connected = True
-            threading.Thread(target=self.receive_messages, daemon=True).start()
-        except ConnectionRefusedError:
-            warning("连接失败", "无法连接到服务器，请确保服务器已启动。")
-            self.is_connected = False
-            return None
+        except OSError as e:
+            # 服务器未启动、网络不通都按连接失败处理，不影响本地对局；点在线匹配时再提示
+            print(f"无法连接到服务器: {e}")
+            self.connecting = False
+            startup.mark("连接服务器失败")
+            return
+        self.is_connected = True
+        self.connecting = False
+        startup.mark("连接服务器")
+        self.receive_messages()
 
     def send_message(self, message):
         if not self.is_connected:
@@ -78,7 +130,12 @@ class ConnectionServer:
                     break
 
                 message = json.loads(data)
-                self.handle_message(message)
+                # 落子、结束等都会改动棋盘和对局状态，交给主线程处理，
+                # 免得与AI、落子提示线程复制棋盘同时进行
+                event = pygame.event.Event(
+                    pygame.USEREVENT, {"action": "network", "message": message}
+                )
+                pygame.event.post(event)
             except Exception as e:
                 print(f"接收消息失败: {e}")
                 self.is_connected = False
@@ -96,6 +153,18 @@ class ConnectionServer:
             self.room_id = message.get("room_id")
             self.player_number = message.get("player_number")
             self.opponent_id = message.get("opponent_id")
+            # 不认识棋盘大小的旧服务器只有15路
+            size = message.get("size", SIZE)
+            rule = message.get("rule", renju.FREESTYLE)
+            if size != game.board.size or rule != RULE:
+                warning(
+                    "无法对局",
+                    f"对局是{size}路棋盘、{RULE_NAMES.get(rule, rule)}，"
+                    f"本机是{game.board.size}路棋盘、{RULE_NAMES[RULE]}",
+                )
+                self.is_matched = True
+                self.quit_room()
+                return
             self.is_matched = True
             game.player = 1
             info(
@@ -109,17 +178,34 @@ class ConnectionServer:
             row = message.get("row")
             player_number = message.get("player_number")
             if player_id != self.player_id:
-                game.board[col][row] = player_number
+                game.board.place(col, row, player_number)
                 game.steps.append((col, row, player_number))
                 game.down = (col, row)
                 game.player = self.player_number  # 轮到自己落子
 
+        elif message_type == "match_error":
+            # 服务器不支持本机的棋盘大小或规则，不再等待匹配
+            button_room.clicked = False
+            game.started = False
+            warning("无法匹配", message.get("reason"))
+
+        elif message_type == "forbidden":
+            # 服务器判定刚才的落子是禁手，撤回本地先落下的子，重新落子
+            if game.steps and game.steps[-1][2] == self.player_number:
+                game.board.undo()
+                game.steps.pop()
+                game.down = game.steps[-1][:2] if game.steps else (-1, -1)
+                game.player = self.player_number
+            warning("禁手", f"黑棋禁手：{message.get('reason')}")
+
         elif message_type == "game_over":
             # 游戏结束
             winner = message.get("winner")
             winner_number = message.get("winner_number")
 
-            if winner == self.player_id:
+            if winner is None:
+                game.winner = "平局！"
+            elif winner == self.player_id:
                 game.winner = "你赢了！"
             else:
                 game.winner = "对手赢了！"
@@ -149,7 +235,7 @@ class ConnectionServer:
         self.player_number = None
         self.opponent_id = None
 
-        self.send_message({"type": "match"})
+        self.send_message({"type": "match", "size": BOARD_SIZE, "rule": RULE})
         return True
 
     def send_move(self, col, row):
@@ -179,32 +265,299 @@ class ConnectionServer:
             pass
 
 
-# 初始化
-pygame.init()
-# 计算窗口的宽和格子的间距
-width = pygame.display.Info().current_h * 0.8
-width = int(width - (width % 15))
-spacing = int(width / 15)
-margins = int(spacing / 2)
-# 计算按钮大小
-rect_height = pygame.display.Info().current_h * 0.1
-button_width = (width - 6 * margins) / 5
-button_height = rect_height * 0.8
-# 设置窗口标题
-pygame.display.set_caption("五子棋")
-# 设置窗口的大小
-screen = pygame.display.set_mode((width, width + rect_height))
+# 棋盘大小：15为标准棋盘，也可以是19或其它（5～25）；在线匹配只与同样大小的玩家配对
+BOARD_SIZE = 15
+# 规则："freestyle"无禁手；"renju"连珠规则，黑棋不能走长连、四四、三三（禁手），AI也遵守
+# 在线匹配只与规则相同的玩家配对
+RULE = renju.FREESTYLE
+RULE_NAMES = {renju.FREESTYLE: "无禁手", renju.RENJU: "连珠禁手"}
 # 当前绝对路径
 folder = pathlib.Path(__file__).parent.resolve()
-# 设置最大帧数
+# python gobang.py --trace 在终端打印启动各阶段的耗时
+STARTUP_TRACE = "--trace" in sys.argv
+# 最大帧数：主循环没有事件时不重画，有事件时两次重画至少间隔1/FPS秒
 FPS = 60
-# 加载背景音乐
-pygame.mixer.music.load(os.path.join(folder, "data", "bgm.mp3"))
-pygame.mixer.music.play(-1)
-pygame.mixer.music.set_volume(0.5)
-# 设置窗口图标
-icon = pygame.image.load(os.path.join(folder, "data", "gobang.png"))
-pygame.display.set_icon(icon)
+# 等待后台结果（AI思考、复盘、落子提示）时最多隔多久检查一次（毫秒），结果一般会发事件唤醒
+POLL_MS = 500
+# 每隔几秒在终端打印帧数、绘制耗时和空闲比例，0为不打印
+FRAME_STATS = 0
+# AI每步的思考时间（秒）
+AI_TIME = 0.2
+# AI评估候选点的方式："python"逐点查增量缓存，"numpy"批量计算（未安装NumPy时自动退回python）
+AI_BACKEND = "python"
+# AI引擎："alphabeta"博弈树搜索，"mcts"蒙特卡洛树搜索；对局中按M键切换下一局用的引擎
+AI_ENGINE = "alphabeta"
+ENGINE_NAMES = {"alphabeta": "博弈树搜索", "mcts": "蒙特卡洛树搜索"}
+# AI搜索用的进程数，大于1时把根节点候选分给多个常驻进程并行搜索
+AI_WORKERS = 1
+# 轮到玩家时AI是否在后台预想玩家的应手
+AI_PONDER = True
+# 对局结束后按A键复盘：每个局面的搜索时间（秒）和进程数，各局面同时分析
+ANALYSIS_TIME = 1.0
+ANALYSIS_WORKERS = os.cpu_count() or 1
+# 按H键显示落子提示：提示几个点，每个局面最多在后台搜索几秒（越久越准）
+HINT_COUNT = 5
+HINT_TIME = 10.0
+# 开局库，用 python -m engine.book 生成，文件不存在时不用
+BOOK_PATH = os.path.join(folder, "data", "book.bin")
+
+
+class StartupTrace:
+    # 启动阶段计时：主线程的阶段打印这一阶段和从开始导入算起的毫秒数，
+    # 后台加载的阶段（字体、音乐、连接服务器）只打印完成时距开始导入的毫秒数
+    def __init__(self, enabled) -> None:
+        self.enabled = enabled
+        self.last = IMPORT_START
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        total = f"共{(now - IMPORT_START) * 1000:.1f}毫秒"
+        if threading.current_thread() is threading.main_thread():
+            print(f"[启动] {phase}：{(now - self.last) * 1000:.1f}毫秒，{total}")
+            self.last = now
+        else:
+            print(f"[启动] {phase}（后台）：{total}")
+
+
+startup = StartupTrace(STARTUP_TRACE)
+
+
+def play_music():
+    # 在后台线程里打开声卡、加载背景音乐；没有声卡或音乐文件时不放音乐
+    try:
+        pygame.mixer.init()
+        pygame.mixer.music.load(os.path.join(folder, "data", "bgm.mp3"))
+        pygame.mixer.music.play(-1)
+        pygame.mixer.music.set_volume(0.5)
+    except pygame.error as e:
+        print(f"无法播放背景音乐: {e}")
+        return
+    startup.mark("背景音乐")
+
+
+def star_points(size):
+    # 天元和星位：(col, row, 半径)；星位在离边第4线（小棋盘第3线），19路以上另加四边中点
+    center = size // 2
+    edge = 3 if size >= 13 else 2
+    points = [(center, center, 8)]
+    if size < 9:
+        return points
+    far = size - 1 - edge
+    points += [(x, y, 6) for x in (edge, far) for y in (edge, far)]
+    if size >= 19:
+        points += [
+            (center, edge, 6), (center, far, 6), (edge, center, 6), (far, center, 6)
+        ]
+    return points
+
+
+class Glyphs:
+    # 字体和文字图像的缓存：每种字号的字体文件只打开一次，同样的文字（步数、按钮、赢家等）
+    # 只渲染一次，之后每帧直接贴图；窗口尺寸变了时全部作废
+    # 字体文件较大，启动时在后台线程里打开，加载完之前文字先不画
+    LIMIT = 4096  # 提示分数等文字不断变化，缓存太多时清空重来
+
+    def __init__(self) -> None:
+        self.path = os.path.join(folder, "data", "simhei.ttf")
+        self.geometry = None
+        self.fonts = {}
+        self.texts = {}
+        self.ready = False
+        self.blank = pygame.Surface((0, 0))
+
+    def load(self, sizes):
+        # 在后台线程里初始化字体模块、打开要用到的各种字号，完成后唤醒主循环重画
+        pygame.font.init()
+        try:
+            fonts = {size: pygame.font.Font(self.path, size) for size in sizes}
+        except (OSError, pygame.error) as e:
+            print(f"无法加载字体，改用默认字体: {e}")
+            self.path = None
+            fonts = {size: pygame.font.Font(None, size) for size in sizes}
+        self.fonts.update(fonts)
+        self.ready = True
+        startup.mark("字体")
+        wake()
+
+    def check(self, geometry):
+        # 每帧调用一次，geometry为决定字号的窗口尺寸
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.fonts.clear()
+            self.texts.clear()
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(self.path, size)
+        return font
+
+    def text(self, text, size, color):
+        if not self.ready:
+            return self.blank
+        key = (text, size, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            if len(self.texts) >= self.LIMIT:
+                self.texts.clear()
+            surface = self.font(size).render(text, True, color)
+            self.texts[key] = surface
+        return surface
+
+
+glyphs = None  # 在window()里创建
+
+
+class Renderer:
+    # 分层绘制：棋盘背景（底色、棋盘线、星位）只画一次，黑白棋子预先画好；
+    # 棋子层 = 背景 + 棋子 + 步数 + 按钮，落子、悔棋时只改动那几格，按钮状态变了才重画按钮；
+    # 落子框、鼠标框、提示、复盘标注、赢家等浮层每帧先用棋子层盖掉上一帧画的，再重新画，
+    # 屏幕上只更新变化的矩形，每帧的开销与棋盘上的子数无关
+    def __init__(self) -> None:
+        self.geometry = None
+        self.full = True  # 下一帧整个窗口重画（第一帧、窗口被遮挡后）
+
+    def check(self, geometry):
+        # 每帧调用一次，窗口尺寸变了时重建各层
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.build()
+
+    def build(self):
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill("#EE9A49")
+        for x in range(BOARD_SIZE):
+            pygame.draw.line(
+                self.background,
+                "#000000",
+                [margins + spacing * x, margins],
+                [margins + spacing * x, width - margins],
+                2,
+            )  # 绘制竖线
+        for y in range(BOARD_SIZE):
+            pygame.draw.line(
+                self.background,
+                "#000000",
+                [margins, margins + spacing * y],
+                [width - margins, margins + spacing * y],
+                2,
+            )  # 绘制横线
+        for col, row, radius in star_points(BOARD_SIZE):
+            pygame.draw.circle(
+                self.background,
+                "#000000",
+                [margins + col * spacing, margins + row * spacing],
+                radius,
+            )  # 天元和星位
+        self.stones = {}
+        for player, color in ((1, "#000000"), (2, "#FFFFFF")):
+            stone = pygame.Surface((spacing, spacing), pygame.SRCALPHA)
+            pygame.draw.circle(stone, color, [margins, margins], margins - 2)
+            self.stones[player] = stone
+        self.layer = self.background.copy()
+        self.steps = []  # 棋子层上已画的着法
+        self.buttons = None  # 棋子层上按钮的状态
+        self.overlays = []  # 上一帧浮层占的矩形
+        self.dirty = []
+        self.full = True
+
+    def begin(self, steps, buttons):
+        # 把棋子层同步到steps和按钮状态，再擦掉上一帧的浮层
+        changed = []
+        n = len(self.steps)
+        if n > len(steps) or steps[:n] != self.steps:
+            # 悔棋或新的一局：从第一处不同开始擦掉
+            n = 0
+            while n < min(len(steps), len(self.steps)) and steps[n] == self.steps[n]:
+                n += 1
+            for col, row, _ in self.steps[n:]:
+                rect = pygame.Rect(col * spacing, row * spacing, spacing, spacing)
+                self.layer.blit(self.background, rect, rect)
+                changed.append(rect)
+        for i in range(n, len(steps)):
+            col, row, player = steps[i]
+            rect = self.layer.blit(self.stones[player], (col * spacing, row * spacing))
+            # 绘制步数
+            color = "#FFFFFF" if player == 1 else "#000000"
+            text_surface = glyphs.text(str(i + 1), int(spacing / 2), color)
+            w, h = text_surface.get_size()
+            text_position = (
+                (margins + spacing * col - w / 2),
+                (margins + spacing * row - h / 2),
+            )
+            changed.append(rect.union(self.layer.blit(text_surface, text_position)))
+        self.steps = list(steps)
+        states = tuple(b.clicked for b in buttons)
+        if states != self.buttons:
+            self.buttons = states
+            for b in buttons:
+                b.draw(self.layer)
+                changed.append(b.rect)
+        if self.full:
+            screen.blit(self.layer, (0, 0))
+        else:
+            for rect in self.overlays + changed:
+                screen.blit(self.layer, rect, rect)
+        self.dirty = self.overlays + changed
+
+    def finish(self, overlays):
+        # overlays为这一帧浮层占的矩形，返回要更新到屏幕上的矩形
+        self.overlays = overlays
+        if self.full:
+            self.full = False
+            return [screen.get_rect()]
+        return self.dirty + overlays
+
+
+renderer = Renderer()
+
+
+class Scheduler:
+    # 事件驱动的主循环节奏：没有事件时阻塞在pygame.event.wait上，几乎不占CPU；
+    # 有输入、网络消息、AI结果等事件时才处理并重画，两次重画至少间隔1/FPS秒
+    def __init__(self, fps, stats=0) -> None:
+        self.fps = fps
+        self.stats = stats  # 每隔几秒打印一次统计，0为不打印
+        self.clock = pygame.time.Clock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.since = time.perf_counter()
+        self.frames = 0
+        self.drawing = 0.0  # 绘制用的总时间（秒）
+        self.slowest = 0.0
+        self.waiting = 0.0  # 阻塞等待事件的总时间（秒）
+
+    def wait(self, timeout=None):
+        # 等到有事件为止，返回这一轮要处理的所有事件；timeout毫秒后没有事件时返回空列表
+        start = time.perf_counter()
+        event = pygame.event.wait(timeout or 0)
+        self.waiting += time.perf_counter() - start
+        events = [] if event.type == pygame.NOEVENT else [event]
+        return events + pygame.event.get()
+
+    def draw(self, frame):
+        # frame()画一帧并返回要更新的矩形；距上一帧不足1/FPS秒时先等一等，连续的事件合并成一帧
+        self.clock.tick(self.fps)
+        start = time.perf_counter()
+        pygame.display.update(frame())
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        self.drawing += elapsed
+        self.slowest = max(self.slowest, elapsed)
+        if self.stats and start - self.since >= self.stats:
+            self.report()
+
+    def report(self):
+        total = time.perf_counter() - self.since
+        print(
+            f"{self.frames}帧（{self.frames / total:.1f}帧/秒），"
+            f"平均绘制{self.drawing / max(self.frames, 1) * 1000:.2f}毫秒，"
+            f"最长{self.slowest * 1000:.2f}毫秒，空闲{self.waiting / total:.0%}"
+        )
+        self.reset_stats()
 
 
 class Button:
@@ -223,10 +576,9 @@ class Button:
             pygame.draw.rect(screen, self.click_color, self.rect)
         else:
             pygame.draw.rect(screen, self.color, self.rect)
-        font = pygame.font.Font(
-            os.path.join(folder, "data", "simhei.ttf"), int(button_height / 2.5)
+        text_surface = glyphs.text(
+            self.text, int(button_height / 2.5), self.text_color
         )
-        text_surface = font.render(self.text, True, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
         screen.blit(text_surface, text_rect)
 
@@ -242,11 +594,7 @@ def handles_event(event):
                 button.clicked = True
                 game.started = True
                 if game.winner != 0:
-                    game.player = 1
-                    game.winner = None
-                    game.board = [[0] * 15 for _ in repeat(None, 15)]
-                    game.steps = []
-                    game.down = (-1, -1)
+                    game.reset()
         elif button_ai.rect.collidepoint(event.pos):
             if (
                 button.clicked is False
@@ -256,11 +604,7 @@ def handles_event(event):
                 button_ai.clicked = True
                 game.started = True
                 if game.winner != 0:
-                    game.player = 1
-                    game.winner = None
-                    game.board = [[0] * 15 for _ in repeat(None, 15)]
-                    game.steps = []
-                    game.down = (-1, -1)
+                    game.reset()
         elif button_room.rect.collidepoint(event.pos):
             global n
             if (
@@ -269,6 +613,9 @@ def handles_event(event):
                 and button_room.clicked is False
             ):
                 # 检查服务器连接状态
+                if game.server.connecting:
+                    info("请稍候", "正在连接服务器……")
+                    return
                 if not game.server.is_connected:
                     warning("连接失败", "无法连接到服务器，请确保服务器已启动。")
                     return
@@ -280,11 +627,7 @@ def handles_event(event):
                     info("等待", "正在等待其他玩家加入房间...")
 
                 if game.winner != 0:
-                    game.player = 1
-                    game.winner = None
-                    game.board = [[0] * 15 for _ in repeat(None, 15)]
-                    game.steps = []
-                    game.down = (-1, -1)
+                    game.reset()
         elif button_restart.rect.collidepoint(event.pos):
             if button.clicked or button_ai.clicked or button_room.clicked:
                 button.clicked = False
@@ -301,135 +644,72 @@ def handles_event(event):
 
                 button_room.clicked = False
                 game.started = False
-                game.player = 1
-                game.winner = None
-                game.board = [[0] * 15 for _ in repeat(None, 15)]
-                game.steps = []
-                game.down = (-1, -1)
+                game.reset()
         elif button_quit.rect.collidepoint(event.pos):
             game.server.close()
+            game.close_ai()
             pygame.quit()
             sys.exit()
 
 
 class Game:
-    def __init__(self, server_ip="127.0.0.1", server_port=547) -> None:
+    def __init__(self, server_ip="127.0.0.1", server_port=547, server=None) -> None:
         self.started = False
         self.player = 1
         self.winner = None
-        self.board = [[0] * 15 for _ in repeat(None, 15)]
+        self.board = Position(BOARD_SIZE)
         self.steps = []
         self.down = (-1, -1)
-        self.clock = pygame.time.Clock()
-        self.server = ConnectionServer(server_ip, server_port)
-
-    def start(self):
-        # 绘制背景
-        screen.fill("#EE9A49")
-        for x in range(15):
-            pygame.draw.line(
-                screen,
-                "#000000",
-                [margins + spacing * x, margins],
-                [margins + spacing * x, width - margins],
-                2,
-            )  # 绘制竖线
-        for y in range(15):
-            pygame.draw.line(
-                screen,
-                "#000000",
-                [margins, margins + spacing * y],
-                [width - margins, margins + spacing * y],
-                2,
-            )  # 绘制横线
-        pygame.draw.circle(
-            screen, "#000000", [margins + 7 * spacing, margins + 7 * spacing], 8
-        )  # 天元
-        pygame.draw.circle(
-            screen, "#000000", [margins + 3 * spacing, margins + 3 * spacing], 6
-        )  # 左上角星位
-        pygame.draw.circle(
-            screen, "#000000", [width - margins - 3 * spacing, margins + 3 * spacing], 6
-        )  # 右上角星位
-        pygame.draw.circle(
-            screen, "#000000", [margins + 3 * spacing, width - margins - 3 * spacing], 6
-        )  # 左下角星位
-        pygame.draw.circle(
-            screen,
-            "#000000",
-            [width - margins - 3 * spacing, width - margins - 3 * spacing],
-            6,
-        )  # 右下角星位
-        # 绘制提示框
-        if self.down != (-1, -1):
-            pygame.draw.rect(
-                screen,
-                "red",
-                [self.down[0] * spacing, self.down[1] * spacing, spacing, spacing],
-                2,
-            )
-
-        # 绘制落子提示
-        x, y = pygame.mouse.get_pos()
-        if y <= width:
-            x = round((x - margins) / spacing) * spacing + margins
-            y = round((y - margins) / spacing) * spacing + margins
-            pygame.draw.rect(
-                screen, "#FFFFFF", [x - margins, y - margins, spacing, spacing], 2
-            )
-
-        # 绘制按钮
-        button.draw(screen)
-        button_ai.draw(screen)
-        button_restart.draw(screen)
-        button_room.draw(screen)
-        button_quit.draw(screen)
-
-        # 绘制落子
-        for col in range(15):
-            for row in range(15):
-                if self.board[col][row] == 1:
-                    pygame.draw.circle(
-                        screen,
-                        "#000000",
-                        [col * spacing + margins, row * spacing + margins],
-                        margins - 2,
-                    )
-                elif self.board[col][row] == 2:
-                    pygame.draw.circle(
-                        screen,
-                        "#FFFFFF",
-                        [col * spacing + margins, row * spacing + margins],
-                        margins - 2,
-                    )
-        # 绘制步数
-        for i in range(1, len(self.steps) + 1):
-            if self.steps[i - 1][2] == 1:
-                color = "#FFFFFF"
-            else:
-                color = "#000000"
-            font = pygame.font.Font(
-                os.path.join(folder, "data", "simhei.ttf"), int(spacing / 2)
-            )
-            text_surface = font.render(str(i), True, color)
-            text_position = (
-                (margins + spacing * self.steps[i - 1][0] - font.size(str(i))[0] / 2),
-                (margins + spacing * self.steps[i - 1][1] - font.size(str(i))[1] / 2),
+        # server为现成的连接对象（性能基准里不连网络），None时新建连接
+        self.server = server or ConnectionServer(server_ip, server_port)
+        # AI每步思考200毫秒，时间到了就返回目前搜到的最好一步；两种引擎用同样的思考时间
+        opening = book.load(BOOK_PATH)
+        self.engines = {
+            name: ai.create(
+                name,
+                workers=AI_WORKERS,
+                time_limit=AI_TIME,
+                backend=AI_BACKEND,
+                book=opening,
+                rule=RULE,
             )
-            screen.blit(text_surface, text_position)
+            for name in ai.ENGINES
+        }
+        self.engine = self.next_engine = AI_ENGINE
+        self.searcher = self.engines[self.engine]
+        # AI在后台线程里思考，主循环每帧取一次结果
+        self.thinker = Thinker(self.searcher, ponder=AI_PONDER, notify=wake)
+        self.thinking = False
+        # 复盘分析的结果（每一步的标注），分析在后台线程里进行
+        self.analyzer = Analyzer(ANALYSIS_WORKERS, ANALYSIS_TIME, rule=RULE)
+        self.analysis = None
+        self.analysing = False
+        # 落子提示在后台线程里计算，绘制时只取结果
+        self.hinter = Hinter(HINT_COUNT, HINT_TIME, rule=RULE, notify=wake)
+        self.hinting = False
+        self.hint_key = None  # 提示对应的局面，局面一变就重新计算
+
+    def reset(self):
+        self.thinker.cancel()
+        self.thinking = False
+        if self.next_engine != self.engine:
+            self.engine = self.next_engine
+            self.searcher = self.engines[self.engine]
+            self.thinker.use(self.searcher)
+            pygame.display.set_caption("五子棋")
+        self.player = 1
+        self.winner = None
+        self.board.reset()
+        self.steps = []
+        self.down = (-1, -1)
+        if self.analysis is not None:
+            self.analysis = None
+            pygame.display.set_caption("五子棋")
 
-        # 绘制赢家
+    def start(self):
+        # 只重画有变化的部分，返回要更新到屏幕上的矩形
+        # 对局结束时先复位按钮和状态，同一帧里就画出来，不必等下一个事件
         if self.winner:
-            font = pygame.font.Font(
-                os.path.join(folder, "data", "simhei.ttf"), margins * 3
-            )
-            text_surface = font.render(self.winner, True, "red")
-            text_position = (
-                (width - font.size(self.winner)[0]) / 2,
-                (width - font.size(self.winner)[1]) / 2,
-            )
-            screen.blit(text_surface, text_position)
-            pygame.display.update()
             button.clicked = False
             button_ai.clicked = False
             # 在线模式下也需要重置状态
@@ -442,6 +722,55 @@ class Game:
                 self.server.opponent_id = None
             self.started = False
             self.down = (-1, -1)
+        glyphs.check((width, spacing, button_height))
+        renderer.check((width, spacing, BOARD_SIZE, glyphs.ready))
+        renderer.begin(
+            self.steps, [button, button_ai, button_restart, button_room, button_quit]
+        )
+        overlays = []
+        # 绘制提示框
+        if self.down != (-1, -1):
+            overlays.append(
+                pygame.draw.rect(
+                    screen,
+                    "red",
+                    [self.down[0] * spacing, self.down[1] * spacing, spacing, spacing],
+                    2,
+                )
+            )
+
+        # 绘制鼠标所在格子的框
+        x, y = pygame.mouse.get_pos()
+        if y <= width:
+            x = round((x - margins) / spacing) * spacing + margins
+            y = round((y - margins) / spacing) * spacing + margins
+            overlays.append(
+                pygame.draw.rect(
+                    screen, "#FFFFFF", [x - margins, y - margins, spacing, spacing], 2
+                )
+            )
+
+        # 绘制引擎推荐的落子点（H键）
+        if self.hinting:
+            overlays += self.draw_hints()
+
+        # 绘制复盘标注
+        if self.analysis:
+            overlays += self.draw_analysis()
+
+        # 绘制赢家（复盘时不挡住棋盘）
+        if self.winner and not self.analysis:
+            text_surface = glyphs.text(self.winner, margins * 3, "red")
+            text_position = (
+                (width - text_surface.get_width()) / 2,
+                (width - text_surface.get_height()) / 2,
+            )
+            overlays.append(screen.blit(text_surface, text_position))
+        return renderer.finish(overlays)
+
+    def busy(self):
+        # 是否在等后台的结果（AI思考、复盘），等待事件时再定时检查一下，以防漏掉唤醒
+        return self.thinking or self.analysing
 
     def mouse_click(self, x, y):
         global n
@@ -450,23 +779,29 @@ class Game:
                 col = round((x - margins) / spacing)
                 row = round((y - margins) / spacing)
                 if button.clicked:  # 双人模式
-                    if self.board[col][row] == 0:
+                    if self.board.is_empty(col, row) and not self.forbidden(
+                        col, row, self.player
+                    ):
                         self.down = (col, row)
-                        self.board[col][row] = self.player
+                        self.board.place(col, row, self.player)
                         self.steps.append((col, row, self.player))
                         if self.five():
                             self.winner = (
                                 "黑子赢了！" if self.player == 1 else "白子赢了！"
                             )
-                        elif not self.get_valid_move():
+                        elif self.board.is_draw:
                             self.winner = "平局！"
                         self.player = abs(self.player - 3)
                 elif button_ai.clicked:  # AI模式
                     pos = (col, row)
-                    if self.valid_input(pos):
-                        self.board[col][row] = 1
+                    if (
+                        self.player == 1
+                        and self.valid_input(pos)
+                        and not self.forbidden(col, row, 1)
+                    ):
+                        self.board.place(col, row, 1)
                         self.steps.append((col, row, 1))
-                        if self.five() or not self.get_valid_move():
+                        if self.board.over:
                             self.winner = "你赢了！" if self.five() else "平局！"
                         else:
                             self.player = 2
@@ -476,433 +811,384 @@ class Game:
                         self.server.is_matched
                         and self.player == self.server.player_number
                     ):
-                        if self.board[col][row] == 0:
+                        if self.board.is_empty(col, row) and not self.forbidden(
+                            col, row, self.player
+                        ):
                             # 发送落子信息到服务器
                             if self.server.send_move(col, row):
                                 # 更新本地棋盘
                                 self.down = (col, row)
-                                self.board[col][row] = self.player
+                                self.board.place(col, row, self.player)
                                 self.steps.append((col, row, self.player))
                                 # 切换玩家（服务器会通过消息再次切换回来）
                                 self.player = abs(self.player - 3)
 
-    def ai_down(self):
-        move = self.get_pos(self.board)
-        self.board[move[0]][move[1]] = 2
-        game.steps.append((move[0], move[1], 2))
-        self.down = move
-        if self.five():
-            self.winner = "你赢了！" if self.five() == 1 else "AI赢了！"
+    def forbidden(self, col, row, player):
+        # 连珠规则下黑棋落在禁手上时不落子，在标题栏提示禁手种类
+        if RULE != renju.RENJU or player != 1:
+            return None
+        reason = renju.forbidden(self.board, col, row)
+        if reason:
+            pygame.display.set_caption(f"五子棋 - 黑棋禁手：{reason}")
+        return reason
+
+    def toggle_engine(self):
+        # 切换下一局AI用的引擎，新的一局开始时生效
+        names = list(self.engines)
+        self.next_engine = names[(names.index(self.next_engine) + 1) % len(names)]
+        if self.next_engine == self.engine:
+            pygame.display.set_caption("五子棋")
         else:
-            self.player = 1
+            pygame.display.set_caption(
+                f"五子棋 - 下一局：{ENGINE_NAMES[self.next_engine]}"
+            )
 
-    def five(self):
-        # 左上，上，右上，左，右，左下，下，右下
-        way = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+    def close_ai(self):
+        self.thinker.close()
+        for engine in self.engines.values():
+            engine.close()
+        self.analyzer.close()
+        self.hinter.close()
+
+    def toggle_hints(self):
+        self.hinting = not self.hinting
+        self.hint_key = None
+        if not self.hinting:
+            self.hinter.hide()
+
+    def hint_player(self):
+        # 需要提示的一方：对局进行中且轮到本机玩家时为当前一方，否则为None
+        if not self.started or self.winner:
+            return None
+        if button_ai.clicked and self.player != 1:
+            return None
+        if button_room.clicked and self.player != self.server.player_number:
+            return None
+        return self.player
+
+    def draw_hints(self):
+        # 局面变了就让后台重新计算，然后画出目前搜得最深的前几名：序号和分数
+        player = self.hint_player()
+        key = (self.board.hash, len(self.steps), player)
+        if key != self.hint_key:
+            self.hint_key = key
+            if player is None:
+                self.hinter.hide()
+            else:
+                self.hinter.show(self.board, player)
+        hints = self.hinter.poll()
+        if player is None or not hints:
+            return []
+        rects = []
+        for rank, ((col, row), value) in enumerate(hints[1], 1):
+            if self.board.get(col, row) != 0:
+                continue
+            center = [col * spacing + margins, row * spacing + margins]
+            rects.append(pygame.draw.circle(screen, "#1E90FF", center, margins - 2, 2))
+            text_surface = glyphs.text(str(rank), int(spacing / 2.5), "#1E90FF")
+            rects.append(
+                screen.blit(text_surface, text_surface.get_rect(center=center))
+            )
+            if value >= WIN - 100:
+                score = "必胜"
+            elif value <= -WIN + 100:
+                score = "必败"
+            else:
+                score = str(value)
+            text_surface = glyphs.text(score, int(spacing / 4), "#000080")
+            rects.append(
+                screen.blit(
+                    text_surface,
+                    text_surface.get_rect(midtop=(center[0], center[1] + margins / 2)),
+                )
+            )
+        return rects
 
-        for i in range(15):
-            for j in range(15):
-                if self.board[i][j] != 0:
-                    get = self.board[i][j]
+    def analyse(self):
+        # 对局结束后复盘，再按一次关闭标注；算完后发事件给主循环
+        if self.started or not self.steps or self.analysing:
+            return
+        if self.analysis is not None:
+            self.analysis = None
+            pygame.display.set_caption("五子棋")
+            return
+        self.analysing = True
+        pygame.display.set_caption("五子棋 - 复盘分析中……")
+        steps = list(self.steps)
 
-                    for w in way:
-                        now = (i, j)
-                        count = 1
+        def run():
+            # 出错时也要发事件，否则一直停在"复盘分析中"
+            result = error = None
+            try:
+                result = self.analyzer.analyse(steps, self.board.size)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            event = pygame.event.Event(
+                pygame.USEREVENT,
+                {
+                    "action": "analysis",
+                    "steps": steps,
+                    "result": result,
+                    "error": error,
+                },
+            )
+            pygame.event.post(event)
 
-                        while True:
-                            if (now[0] + w[0] not in range(15)) or (
-                                now[1] + w[1] not in range(15)
-                            ):
-                                break
+        threading.Thread(target=run, daemon=True).start()
 
-                            now = (now[0] + w[0], now[1] + w[1])
+    def analysis_done(self, steps, result, error=None):
+        self.analysing = False
+        if error is not None:
+            pygame.display.set_caption("五子棋")
+            warning("复盘失败", error)
+            return
+        if steps != self.steps:
+            return  # 分析期间已经开始了新的一局
+        self.analysis = result
+        counts = []
+        for player, name in ((1, "黑"), (2, "白")):
+            marks = [r["mark"] for r in result if r["player"] == player]
+            counts.append(
+                f"{name}败着{marks.count('败着')}、疑问手{marks.count('疑问手')}"
+            )
+        pygame.display.set_caption(f"五子棋 - 复盘：{'，'.join(counts)}")
+
+    def draw_analysis(self):
+        # 败着画红圈、疑问手画橙圈；引擎推荐的着法画绿圈，标上对应的步数
+        rects = []
+        for r in self.analysis:
+            if not r["mark"]:
+                continue
+            color = "red" if r["mark"] == "败着" else "#FF8C00"
+            col, row = r["move"]
+            center = [col * spacing + margins, row * spacing + margins]
+            rects.append(pygame.draw.circle(screen, color, center, margins - 1, 3))
+            if r["best"] is None:
+                continue
+            col, row = r["best"]
+            center = [col * spacing + margins, row * spacing + margins]
+            rects.append(pygame.draw.circle(screen, "#00A000", center, margins - 2, 2))
+            if self.board.get(col, row) == 0:
+                text_surface = glyphs.text(str(r["ply"]), int(spacing / 3), "#00A000")
+                rects.append(
+                    screen.blit(text_surface, text_surface.get_rect(center=center))
+                )
+        return rects
+
+    def takeback(self):
+        # 悔棋：双人模式退一步，AI模式连同AI的应手一起退回到自己落子之前
+        if not self.started or button_room.clicked or not self.steps:
+            return
+        self.thinker.cancel()
+        self.thinking = False
+        if button_ai.clicked:
+            while self.steps and self.steps[-1][2] == 2:
+                self.board.undo()
+                self.steps.pop()
+            if not self.steps:
+                return
+        self.board.undo()
+        col, row, player = self.steps.pop()
+        self.player = player
+        self.down = self.steps[-1][:2] if self.steps else (-1, -1)
 
-                            if self.board[now[0]][now[1]] != get:
-                                break
-                            else:
-                                count += 1
+    def ai_down(self):
+        # 轮到AI时交给后台思考，之后每帧检查一次，算好了才落子
+        if not self.thinking:
+            self.thinking = True
+            self.thinker.think(self.board, 2)
+        move = self.thinker.poll()
+        if move is None:
+            return
+        self.thinking = False
+        self.board.place(move[0], move[1], 2)
+        self.steps.append((move[0], move[1], 2))
+        self.down = move
+        if self.five():
+            self.winner = "你赢了！" if self.five() == 1 else "AI赢了！"
+        elif self.board.is_draw:
+            self.winner = "平局！"
+        else:
+            self.player = 1
+            self.thinker.ponder(self.board, 1)
 
-                                if count == 5:
-                                    return get
-        return False
+    def five(self):
+        return ai.five(self.board)
 
     def valid_input(self, pos):
-        if pos[0] not in range(15) or pos[1] not in range(15):
+        if not self.board.inside(pos[0], pos[1]):
             return False
-        if self.board[pos[0]][pos[1]] != 0:
+        if self.board.get(pos[0], pos[1]) != 0:
             return False
         return True
 
     def get_valid_move(self):
-        ret = []
-        for i in range(15):
-            for j in range(15):
-                if self.board[i][j] == 0:
-                    ret.append((i, j))
-        return ret
+        return ai.get_valid_move(self.board)
 
     def get_charge_pos(self, board):
-        way = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-        ret = []
-
-        for i in range(15):
-            for j in range(15):
-                if board[i][j] != 0:
-                    for w in way:
-                        pos = (i + w[0], j + w[1])
-                        if pos[0] not in range(15) or pos[1] not in range(15):
-                            continue
-                        if (board[pos[0]][pos[1]] == 0) and (pos not in ret):
-                            ret.append(pos)
-
-        return ret
+        return ai.get_charge_pos(board)
 
     def get_line_score(self, line):
-        # 连五 ： 100000, 活四，双冲四，冲四活三 ： 10000, 双活三 ： 5000, 活三眠三 ： 1000
-        # 眠四 ： 500, 活三 ： 200, 双活二 ： 100, 眠三 ： 50, 活二眠二 ： 10, 活二 ： 5
-        # 眠二 ：3, 死四 ： -5, 死三 ： -5, 死二 ： -5
-
-        score = 0
-
-        # 连五
-        for i in line:
-            if i.find("22222") != -1:
-                score += 100000
-                break
-
-        # 活四
-        for i in line:
-            if i.find("022220") != -1:
-                score += 50000
-                break
-
-        # 双冲四
-        count = 0
-        for i in line:
-            for size in ["022221", "122220", "20222", "22202", "22022"]:
-                if i.find(size) != -1:
-                    count += 1
-                    break
-
-            if count == 2:
-                score += 10000
-                break
-
-        # 冲四活三
-        ft = [0, 0]
-        for i in line:
-            if not ft[0]:
-                for size in ["022221", "122220", "20222", "22202", "22022"]:
-                    if i.find(size) != -1:
-                        ft[0] = 1
-                        break
-
-            if not ft[1]:
-                for size in ["02220", "2022", "2202"]:
-                    if i.find(size) != -1:
-                        ft[1] = 1
-                        break
-
-            if ft[0] and ft[1]:
-                score += 10000
-                break
-
-        # 双活三
-        count = 0
-        for i in line:
-            for size in ["02220", "2022", "2202"]:
-                if i.find(size) != -1:
-                    count += 1
-                    break
-
-            if count == 2:
-                score += 10000
-                break
-
-        # 活三眠三
-        tt = [0, 0]
-        for i in line:
-            if not tt[0]:
-                for size in ["02220", "2022", "2202"]:
-                    if i.find(size) != -1:
-                        tt[0] = 1
-                        break
-
-            if not tt[1]:
-                for size in [
-                    "002221",
-                    "122200",
-                    "020221",
-                    "122020",
-                    "022021",
-                    "120220",
-                    "20022",
-                    "22002",
-                    "20202",
-                    "1022201",
-                ]:
-                    if i.find(size) != -1:
-                        tt[1] = 1
-                    break
-
-            if tt[0] and tt[1]:
-                score += 1000
-                break
-
-        # 眠四
-
-        # 活三
-        count = 0
-        for i in line:
-            for size in ["02220", "2022", "2202"]:
-                if i.find(size) != -1:
-                    count += 1
-                    break
-        score += count * 200
-
-        # 双活二
-        count = 0
-        for i in line:
-            for size in ["002200", "02020", "2002"]:
-                if i.find(size) != -1:
-                    count += 1
-                    break
-            if count == 2:
-                score += 100
-                break
-
-        # 眠三
-        count = 0
-        for i in line:
-            for size in [
-                "002221",
-                "122200",
-                "020221",
-                "122020",
-                "022021",
-                "120220",
-                "20022",
-                "22002",
-                "20202",
-                "1022201",
-            ]:
-                if i.find(size) != -1:
-                    count += 1
-                    break
-        score += count * 50
-
-        # 活二眠二
-        dd = [0, 0]
-        for i in line:
-            if not dd[0]:
-                for size in ["002200", "02020", "2002"]:
-                    if i.find(size) != -1:
-                        dd[0] = 1
-                        break
-
-            if not dd[1]:
-                for size in [
-                    "000221",
-                    "122000",
-                    "002021",
-                    "120200",
-                    "020021",
-                    "120020",
-                    "20002",
-                ]:
-                    if i.find(size) != -1:
-                        dd[1] = 1
-                        break
-
-            if dd[0] and dd[1]:
-                score += 10
-                break
-
-        # 活二
-        count = 0
-        for i in line:
-            for size in ["002200", "02020", "2002"]:
-                if i.find(size) != -1:
-                    count += 1
-                    break
-        score += count * 5
-
-        # 眠二
-        count = 0
-        for i in line:
-            for size in [
-                "000221",
-                "122000",
-                "002021",
-                "120200",
-                "020021",
-                "120020",
-                "20002",
-            ]:
-                if i.find(size) != -1:
-                    count += 1
-                    break
-        score += count * 3
-
-        # 死四，死三，死二
-        count = 0
-        for i in line:
-            if i.find("122221") != -1:
-                count += 1
-            if i.find("12221") != -1:
-                count += 1
-            if i.find("1221") != -1:
-                count += 1
-        score += count * -5
-
-        return score
+        return ai.get_line_score(line)
 
     def get_score(self, pos, board):
-
-        ori = copy.deepcopy(board)
-        ori[pos[0]][pos[1]] = 2
-
-        # 横，竖
-        h = str(ori[pos[0]])[1:-1].replace(",", "").replace(" ", "")
-        s = (
-            str([ori[i][pos[1]] for i in range(15)])[1:-1]
-            .replace(",", "")
-            .replace(" ", "")
-        )
-
-        # 左斜
-        lx = (
-            str(
-                [
-                    ori[i][i - pos[0] + pos[1]]
-                    for i in range(15)
-                    if (i - pos[0] + pos[1]) in range(15)
-                ]
-            )[1:-1]
-            .replace(",", "")
-            .replace(" ", "")
-        )
-
-        # 右斜
-        rx = (
-            str(
-                [
-                    ori[i][pos[0] + pos[1] - i]
-                    for i in range(15)
-                    if (pos[0] + pos[1] - i) in range(15)
-                ]
-            )[1:-1]
-            .replace(",", "")
-            .replace(" ", "")
-        )
-
-        return self.get_line_score([h, s, lx, rx])
+        return ai.get_score(pos, board)
 
     def opp_board(self, board):
-        o_board = [[0] * 15 for _ in repeat(None, 15)]
-
-        for i in range(15):
-            for j in range(15):
-                if board[i][j] != 0:
-                    o_board[i][j] = 1 if board[i][j] == 2 else 2
-
-        return o_board
+        return ai.opp_board(board)
 
     def get_pos(self, board):
-        pos = self.get_charge_pos(board)
-
-        get = (-1, -1)
-        score = -float("inf")
-
-        for p in pos:
-            o_board = self.opp_board(board)
-            s = self.get_score(p, board) + self.get_score(p, o_board)
-            if s > score:
-                get = p
-                score = s
-
-        return get
-
-
-game = Game("39.107.242.163")
-button = Button(
-    margins,
-    width,
-    button_width,
-    button_height,
-    "双人模式",
-    (153, 51, 250),
-    (221, 160, 221),
-    (255, 255, 255),
-)
-button_ai = Button(
-    margins * 2 + button_width,
-    width,
-    button_width,
-    button_height,
-    "AI模式",
-    (255, 127, 0),
-    (255, 150, 50),
-    (255, 255, 255),
-)
-button_room = Button(
-    margins * 3 + button_width * 2,
-    width,
-    button_width,
-    button_height,
-    "在线匹配",
-    (51, 51, 255),
-    (0, 128, 255),
-    (255, 255, 255),
-)
-button_restart = Button(
-    margins * 4 + button_width * 3,
-    width,
-    button_width,
-    button_height,
-    "重新开始",
-    (15, 173, 14),
-    (15, 173, 14),
-    (255, 255, 255),
-)
-button_quit = Button(
-    margins * 5 + button_width * 4,
-    width,
-    button_width,
-    button_height,
-    "退出",
-    (224, 55, 51),
-    (224, 55, 51),
-    (255, 255, 255),
-)
-
-
-while True:
-    game.clock.tick(FPS)
-    for event in pygame.event.get():
-        if event.type == pygame.USEREVENT:
-            if hasattr(event, "dict") and "action" in event.dict:
-                root = tk.Tk()
-                root.withdraw()
-                if event.dict["action"] == "show_info":
-                    messagebox.showinfo(event.dict["title"], event.dict["message"])
-                elif event.dict["action"] == "show_warning":
-                    messagebox.showwarning(event.dict["title"], event.dict["message"])
-                root.destroy()
-        elif event.type == pygame.QUIT:
-            game.server.close()
-            pygame.quit()
-            sys.exit()
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            x, y = pygame.mouse.get_pos()
-            handles_event(event)
-            game.mouse_click(x, y)
-            if button_ai.clicked and game.player == 2:
-                game.ai_down()
-
-    if button_ai.clicked and game.player == 2:
-        game.ai_down()
-
-    game.start()
-
-    pygame.display.update()
+        # 以一层评分排序候选点，再在时间限制内逐层加深（或蒙特卡洛树搜索）
+        return self.searcher.search(board, 2)
+
+def window(height):
+    # 按屏幕高度计算窗口、格子和按钮的尺寸，打开窗口、创建按钮和字体缓存，返回要用到的字号
+    global width, spacing, margins, rect_height, button_width, button_height, screen
+    global glyphs, button, button_ai, button_room, button_restart, button_quit
+    # 计算窗口的宽和格子的间距
+    width = height * 0.8
+    width = int(width - (width % BOARD_SIZE))
+    spacing = int(width / BOARD_SIZE)
+    margins = int(spacing / 2)
+    # 计算按钮大小
+    rect_height = height * 0.1
+    button_width = (width - 6 * margins) / 5
+    button_height = rect_height * 0.8
+    # 设置窗口的大小
+    screen = pygame.display.set_mode((width, width + rect_height))
+    glyphs = Glyphs()
+    glyphs.check((width, spacing, button_height))
+    button = Button(
+        margins,
+        width,
+        button_width,
+        button_height,
+        "双人模式",
+        (153, 51, 250),
+        (221, 160, 221),
+        (255, 255, 255),
+    )
+    button_ai = Button(
+        margins * 2 + button_width,
+        width,
+        button_width,
+        button_height,
+        "AI模式",
+        (255, 127, 0),
+        (255, 150, 50),
+        (255, 255, 255),
+    )
+    button_room = Button(
+        margins * 3 + button_width * 2,
+        width,
+        button_width,
+        button_height,
+        "在线匹配",
+        (51, 51, 255),
+        (0, 128, 255),
+        (255, 255, 255),
+    )
+    button_restart = Button(
+        margins * 4 + button_width * 3,
+        width,
+        button_width,
+        button_height,
+        "重新开始",
+        (15, 173, 14),
+        (15, 173, 14),
+        (255, 255, 255),
+    )
+    button_quit = Button(
+        margins * 5 + button_width * 4,
+        width,
+        button_width,
+        button_height,
+        "退出",
+        (224, 55, 51),
+        (224, 55, 51),
+        (255, 255, 255),
+    )
+    return {
+        int(button_height / 2.5),  # 按钮
+        int(spacing / 2),  # 步数
+        margins * 3,  # 赢家
+        int(spacing / 2.5),  # 提示序号
+        int(spacing / 4),  # 提示分数
+        int(spacing / 3),  # 复盘标注
+    }
+
+
+def setup():
+    # 启动：先占端口、开窗口、画出第一帧，字体、音乐、连接服务器在后台进行
+    global WAKE, game
+    lock()
+    startup.mark("导入模块")
+    pygame.display.init()
+    WAKE = pygame.event.custom_type()
+    # 设置窗口标题和图标
+    pygame.display.set_caption("五子棋")
+    icon = pygame.image.load(os.path.join(folder, "data", "gobang.png"))
+    pygame.display.set_icon(icon)
+    sizes = window(pygame.display.Info().current_h)
+    startup.mark("打开窗口")
+    threading.Thread(target=glyphs.load, args=(sizes,), daemon=True).start()
+    threading.Thread(target=play_music, daemon=True).start()
+    game = Game("39.107.242.163")
+    startup.mark("创建对局")
+    pygame.display.update(game.start())
+    startup.mark("第一帧")
+
+
+def main():
+    setup()
+    scheduler = Scheduler(FPS, FRAME_STATS)
+    while True:
+        for event in scheduler.wait(POLL_MS if game.busy() else None):
+            if event.type == pygame.USEREVENT:
+                if event.dict.get("action") == "network":
+                    game.server.handle_message(event.dict["message"])
+                elif event.dict.get("action") == "analysis":
+                    game.analysis_done(
+                        event.dict["steps"], event.dict["result"], event.dict["error"]
+                    )
+                elif event.dict.get("action") in ("show_info", "show_warning"):
+                    dialog(
+                        event.dict["action"], event.dict["title"], event.dict["message"]
+                    )
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.full = True  # 窗口被对话框等挡住过
+            elif event.type == pygame.QUIT:
+                game.server.close()
+                game.close_ai()
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN and event.key in (
+                pygame.K_BACKSPACE,
+                pygame.K_z,
+            ):
+                # 退格键或Z键悔棋
+                game.takeback()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_m:
+                game.toggle_engine()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_a:
+                game.analyse()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                game.toggle_hints()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                x, y = pygame.mouse.get_pos()
+                handles_event(event)
+                game.mouse_click(x, y)
+                if button_ai.clicked and game.player == 2:
+                    game.ai_down()
+
+        if button_ai.clicked and game.player == 2:
+            game.ai_down()
+
+        scheduler.draw(game.start)
+
+
+if __name__ == "__main__":
+    # 打包成单个可执行文件后，复盘、多进程搜索的工作进程也从这里启动，
+    # 要在占端口、开窗口之前转去执行工作进程的任务
+    multiprocessing.freeze_support()
+    main()
@@ -3,6 +3,11 @@ import os
 import socket
 import random
 import json
+from engine.bitboard import SIZE
+from engine.rules import Board
+from engine import renju
+
+MAX_SIZE = 25  # 允许的最大棋盘
 
 
 class ChatServer:
@@ -36,6 +41,8 @@ class ChatServer:
             "room_id": None,
             "status": "waiting",
             "player_number": None,
+            "size": SIZE,
+            "rule": renju.FREESTYLE,
         }
 
         try:
@@ -60,7 +67,25 @@ class ChatServer:
         message_type = message.get("type")
 
         if message_type == "match":
-            self.match_player(player_id)
+            # 客户端可以指定棋盘大小和规则，不指定时为15路、无禁手
+            size = message.get("size", SIZE)
+            rule = message.get("rule", renju.FREESTYLE)
+            # 不支持时回复原因，不然客户端会一直等着匹配
+            if not isinstance(size, int) or isinstance(size, bool):
+                reason = f"棋盘大小无效：{size!r}"
+            elif not 5 <= size <= MAX_SIZE:
+                reason = f"不支持{size}路棋盘，只支持5～{MAX_SIZE}路"
+            elif rule not in renju.RULES:
+                reason = f"不支持的规则：{rule!r}"
+            else:
+                self.players[player_id]["size"] = size
+                self.players[player_id]["rule"] = rule
+                self.match_player(player_id)
+                return
+            self.send_message(
+                self.players[player_id]["client"],
+                {"type": "match_error", "reason": reason},
+            )
 
         elif message_type == "move":
             room_id = self.players[player_id]["room_id"]
@@ -83,9 +108,18 @@ class ChatServer:
         if player_id not in self.waiting_players:
             self.waiting_players.append(player_id)
 
-        if len(self.waiting_players) >= 2:
-            player1_id = self.waiting_players.pop(0)
-            player2_id = self.waiting_players.pop(0)
+        # 只与棋盘大小、规则都相同的玩家配对
+        size = self.players[player_id]["size"]
+        rule = self.players[player_id]["rule"]
+        same = [
+            p
+            for p in self.waiting_players
+            if self.players[p]["size"] == size and self.players[p]["rule"] == rule
+        ]
+        if len(same) >= 2:
+            player1_id, player2_id = same[:2]
+            self.waiting_players.remove(player1_id)
+            self.waiting_players.remove(player2_id)
 
             room_id = f"room_{random.randint(1000, 9999)}"
             while room_id in self.rooms:
@@ -93,7 +127,8 @@ class ChatServer:
 
             self.rooms[room_id] = {
                 "players": [player1_id, player2_id],
-                "board": [[0] * 15 for _ in range(15)],
+                "board": Board(size),
+                "rule": rule,
                 "current_player": player1_id,
                 "status": "playing",
             }
@@ -113,6 +148,8 @@ class ChatServer:
                     "room_id": room_id,
                     "player_number": 1,
                     "opponent_id": player2_id,
+                    "size": size,
+                    "rule": rule,
                 },
             )
 
@@ -123,6 +160,8 @@ class ChatServer:
                     "room_id": room_id,
                     "player_number": 2,
                     "opponent_id": player1_id,
+                    "size": size,
+                    "rule": rule,
                 },
             )
 
@@ -134,11 +173,22 @@ class ChatServer:
         if room["current_player"] != player_id:
             return
 
-        if col < 0 or col >= 15 or row < 0 or row >= 15 or room["board"][col][row] != 0:
+        board = room["board"]
+        if not isinstance(col, int) or not isinstance(row, int):
+            return
+        if not board.is_empty(col, row):  # 包括棋盘外
             return
 
         player_number = self.players[player_id]["player_number"]
-        room["board"][col][row] = player_number
+        if room["rule"] == renju.RENJU and player_number == 1:
+            reason = renju.forbidden(board, col, row)
+            if reason:
+                self.send_message(
+                    self.players[player_id]["client"],
+                    {"type": "forbidden", "reason": reason},
+                )
+                return
+        board.place(col, row, player_number)
 
         opponent_id = (
             room["players"][0]
@@ -159,12 +209,12 @@ class ChatServer:
         self.send_message(self.players[player_id]["client"], move_info)
         self.send_message(self.players[opponent_id]["client"], move_info)
 
-        winner = self.check_winner(room["board"], col, row, player_number)
-        if winner:
+        winner = self.check_winner(board, col, row, player_number)
+        if winner or board.is_draw:
             game_over_info = {
                 "type": "game_over",
-                "winner": player_id,
-                "winner_number": player_number,
+                "winner": player_id if winner else None,
+                "winner_number": player_number if winner else None,
             }
             self.send_message(self.players[player_id]["client"], game_over_info)
             self.send_message(self.players[opponent_id]["client"], game_over_info)
@@ -176,34 +226,9 @@ class ChatServer:
             self.players[opponent_id]["status"] = "waiting"
 
     def check_winner(self, board, col, row, player_number):
-        directions = [
-            [(0, 1), (0, -1)],
-            [(1, 0), (-1, 0)],
-            [(1, 1), (-1, -1)],
-            [(1, -1), (-1, 1)],
-        ]
-
-        for direction_pair in directions:
-            count = 1
-
-            for dx, dy in direction_pair:
-                x, y = col, row
-                while True:
-                    x += dx
-                    y += dy
-                    if (
-                        x < 0
-                        or x >= 15
-                        or y < 0
-                        or y >= 15
-                        or board[x][y] != player_number
-                    ):
-                        break
-                    count += 1
-
-            if count >= 5:
-                return player_number
-
+        # 落子时规则核心已算好经过最后一步的四条线
+        if board.winner == player_number:
+            return player_number
         return None
 
     def handle_quit_room(self, player_id):
@@ -0,0 +1,21 @@
+# 工作进程意外退出后，复盘改在当前进程里完成，下一次分析重新建进程池
+from engine.analysis import Analyzer
+
+STEPS = [(7, 7, 1), (8, 8, 2), (7, 8, 1), (9, 9, 2), (7, 9, 1), (0, 0, 2)]
+
+
+def test_broken_pool_falls_back_to_serial():
+    analyzer = Analyzer(2, time_limit=None, node_limit=200)
+    try:
+        analyzer.analyse(STEPS[:2])
+        assert analyzer.pool is not None
+        for process in list(analyzer.pool._processes.values()):
+            process.kill()
+            process.join()
+        result = analyzer.analyse(STEPS)
+        assert [r["move"] for r in result] == [s[:2] for s in STEPS]
+        assert analyzer.pool is None
+        analyzer.analyse(STEPS + [(1, 1, 1), (2, 2, 2)])
+        assert analyzer.pool is not None
+    finally:
+        analyzer.close()
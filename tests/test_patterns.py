@@ -0,0 +1,52 @@
+# 查表分类与evaluate里逐个子串查找的参考实现逐条比对
+import itertools
+import random
+
+import pytest
+
+from engine import evaluate, patterns
+from engine.bitboard import BLACK, WHITE
+
+CHARS = {BLACK: "021", WHITE: "012"}  # 以"2"为己方的字符串
+
+
+@pytest.fixture(autouse=True)
+def default_weights():
+    # 参考实现的权重是写死的，比对时用默认权重，之后恢复原来的权重
+    saved = list(evaluate.weights)
+    evaluate.use(evaluate.DEFAULT_WEIGHTS)
+    yield
+    evaluate.weights[:] = saved
+    evaluate._combined.clear()
+
+
+def check(values):
+    for player in (BLACK, WHITE):
+        line = "".join(CHARS[player][v] for v in values)
+        assert patterns.classify(values, player) == evaluate.line_features(line), line
+        codes = patterns.window_codes(values)
+        for k, flags in patterns.empty_features(values, codes, player):
+            placed = line[:k] + "2" + line[k + 1 :]
+            assert flags == evaluate.line_features(placed), placed
+
+
+def test_short_lines_exhaustive():
+    for n in range(1, 8):
+        for values in itertools.product(range(3), repeat=n):
+            check(values)
+
+
+def test_long_lines_random():
+    rng = random.Random(0)
+    for _ in range(3000):
+        check([rng.choice((0, 0, 1, 2)) for _ in range(rng.randint(8, 19))])
+
+
+def test_line_score_matches_reference():
+    rng = random.Random(1)
+    for _ in range(3000):
+        line = [
+            "".join(rng.choice("0012") for _ in range(rng.randint(1, 15)))
+            for _ in range(4)
+        ]
+        assert patterns.get_line_score(line) == evaluate.get_line_score(line), line
@@ -0,0 +1,60 @@
+# Gomocup协议：BOARD、TURN、TAKEBACK的输入检查
+import io
+
+from engine.protocol import Brain
+
+
+def run(*lines):
+    # 每步只想50毫秒；返回应答的各行和Brain
+    out = io.StringIO()
+    brain = Brain(out=out)
+    brain.run(["START 15", "INFO timeout_turn 100", *lines, "END"])
+    return out.getvalue().splitlines(), brain
+
+
+def is_move(line):
+    col, row = (int(v) for v in line.split(","))
+    return 0 <= col < 15 and 0 <= row < 15
+
+
+def board(*stones):
+    return ["BOARD", *stones, "DONE"]
+
+
+def test_board_rejects_bad_lines_and_keeps_board():
+    for bad in ("7,x,1", "7,7", "7,7,4", "15,3,1", "-1,0,2"):
+        replies, brain = run("TURN 7,7", *board("3,3,1", bad))
+        assert replies[0] == "OK" and is_move(replies[1])
+        assert replies[2] == "ERROR invalid board", bad
+        assert len(brain.board.moves) == 2 and brain.board.moves[0][:2] == (7, 7)
+
+
+def test_board_rejects_duplicates():
+    replies, _ = run(*board("7,7,1", "8,8,2", "7,7,2"))
+    assert replies[1:] == ["ERROR invalid board"]
+
+
+def test_board_skips_winning_line_marks():
+    replies, brain = run(*board("7,7,2", "8,8,1", "9,9,3"))
+    assert is_move(replies[1])
+    stones = [m[:2] for m in brain.board.moves[:2]]
+    assert stones == [(7, 7), (8, 8)]
+    assert len(brain.board.moves) == 3
+
+
+def test_board_full():
+    out = io.StringIO()
+    stones = [f"{c},{r},{1 + (c + r) % 2}" for c in range(5) for r in range(5)]
+    Brain(out=out).run(["START 5", *board(*stones), "END"])
+    assert out.getvalue().splitlines() == ["OK", "ERROR board is full"]
+
+
+def test_turn_and_takeback_errors():
+    replies, brain = run(
+        "TURN 99,99", "TURN a,b", "TURN 7,7", "TURN 7,7", "TAKEBACK 0,0", "TAKEBACK 7,7"
+    )
+    assert replies[1:3] == ["ERROR invalid move"] * 2
+    assert is_move(replies[3])
+    assert replies[4:] == ["ERROR invalid move", "ERROR invalid move", "OK"]
+    reply = tuple(int(v) for v in replies[3].split(","))
+    assert [m[:2] for m in brain.board.moves] == [reply]
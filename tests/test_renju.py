@@ -0,0 +1,69 @@
+# 连珠规则的黑棋禁手：带缓存的Position与规则核心rules.Board判断结果相同
+import pytest
+
+from engine import renju
+from engine.bitboard import BLACK, WHITE
+from engine.position import Position
+from engine.rules import Board
+
+X = (7, 7)  # 每个局面都判断黑棋落在这里
+
+
+def build(cls, black, white=()):
+    board = cls(15)
+    for col, row in black:
+        board.place(col, row, BLACK)
+    for col, row in white:
+        board.place(col, row, WHITE)
+    return board
+
+
+CASES = {
+    # 横、竖两个活三
+    "double_three": ([(5, 7), (6, 7), (7, 5), (7, 6)], (), renju.DOUBLE_THREE),
+    # 同一条线上的两个四：B.BXB.B
+    "double_four_one_line": (
+        [(4, 7), (6, 7), (8, 7), (10, 7)],
+        (),
+        renju.DOUBLE_FOUR,
+    ),
+    # 横竖各一个冲四
+    "double_four": (
+        [(4, 7), (5, 7), (6, 7), (7, 4), (7, 5), (7, 6)],
+        [(3, 7), (7, 3)],
+        renju.DOUBLE_FOUR,
+    ),
+    # 六子连
+    "overline": ([(4, 7), (5, 7), (6, 7), (8, 7), (9, 7)], (), renju.OVERLINE),
+    # 恰好成五，同时的三三不算禁手
+    "five_overrides": (
+        [(3, 7), (4, 7), (5, 7), (6, 7), (7, 5), (7, 6), (5, 5), (6, 6)],
+        (),
+        None,
+    ),
+    # 一头被白子堵住的三走不成活四，不算三
+    "blocked_three": ([(5, 7), (6, 7), (7, 5), (7, 6)], [(4, 7)], None),
+    # 斜、反斜两个三，成三三
+    "split_double_three": ([(4, 4), (5, 5), (6, 8), (9, 5)], (), renju.DOUBLE_THREE),
+    # 同上，但斜线的三只能在(6, 6)走成活四，而那里是黑棋的四四，这个三不算
+    "three_needs_forbidden_point": (
+        [(4, 4), (5, 5), (6, 8), (9, 5), (8, 4), (9, 3), (10, 2)],
+        (),
+        None,
+    ),
+    # 只有一个活三
+    "single_three": ([(5, 7), (6, 7)], (), None),
+}
+
+
+@pytest.mark.parametrize("cls", [Position, Board])
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_forbidden(cls, name):
+    black, white, expected = CASES[name]
+    board = build(cls, black, white)
+    assert renju.forbidden(board, *X) == expected
+    bit = 1 << (X[0] * board.stride + X[1])
+    assert bool(renju.forbidden_cells(board, bit)) == (expected is not None)
+    assert bool(renju.legal(board, bit)) == (expected is None)
+    # 判断时临时落下的子都要撤掉
+    assert board.is_empty(*X)
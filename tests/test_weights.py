@@ -0,0 +1,54 @@
+# 调过的权重相加后不能越级：不成五的点低于FIVE，没有杀棋型的点低于THREAT
+import pytest
+
+from engine import batch, evaluate
+from engine.bitboard import BLACK, WHITE
+from engine.position import Position
+from engine.search import FIVE, THREAT, Searcher
+
+# 每项都在tune的截断范围内，相加后双冲四的点超过连五
+TUNED = {"rush_four": 30000, "double_rush_four": 45000, "live_three": 9000}
+
+
+@pytest.fixture(autouse=True)
+def tuned_weights():
+    saved = list(evaluate.weights)
+    evaluate.use(TUNED)
+    yield
+    evaluate.weights[:] = saved
+    evaluate._combined.clear()
+
+
+def position():
+    # 黑棋在(6,7)落子成双冲四，白棋已在第10列成四，黑棋必须堵(10,14)
+    board = Position(15)
+    moves = [
+        (3, 7), (2, 7), (4, 7), (6, 11), (5, 7), (10, 10), (6, 8),
+        (10, 11), (6, 9), (10, 12), (6, 10), (10, 13), (10, 9), (0, 0),
+    ]
+    for i, (col, row) in enumerate(moves):
+        board.place(col, row, BLACK if i % 2 == 0 else WHITE)
+    return board
+
+
+def check(moves, board, player):
+    for _, attack, _, (col, row) in moves:
+        flags = [board.cache[player][d][board.index(col, row)] for d in range(4)]
+        f = evaluate.features(*flags)
+        if not f[0]:
+            assert attack < FIVE, (col, row)
+        if not any(f[:5]):
+            assert attack < THREAT, (col, row)
+
+
+def test_scores_stay_in_their_tier():
+    board = position()
+    for player in (BLACK, WHITE):
+        check(board.candidates(player), board, player)
+        if batch.available:
+            check(batch.candidates(board, player, board.radius), board, player)
+
+
+def test_search_blocks_four_with_tuned_weights():
+    searcher = Searcher(time_limit=None, node_limit=3000)
+    assert searcher.search(position(), BLACK) == (10, 14)